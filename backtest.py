@@ -0,0 +1,44 @@
+import argparse
+import json
+import time
+
+from src.candle_store import CandleStore
+from src.data import fetch_history, add_atr
+from src.backtest import run_backtest, summarize, format_report
+from runner import SYMBOLS, TIMEFRAMES, CONFIDENCE_THRESHOLD, MAX_SIGNALS_PER_RUN
+
+def load_frames(symbols, timeframes, days, store_path, fetch=True):
+    # Stored history of the last `days` days per (symbol, tf), topped up from Binance
+    start_ms = int((time.time() - days * 86400) * 1000)
+    store = CandleStore(store_path, window=10_000_000)
+    frames = {}
+    for symbol in symbols:
+        for tf in timeframes:
+            if fetch:
+                fetch_history(symbol, tf, start_ms, store=store)
+            frames[(symbol, tf)] = add_atr(store.load(symbol, tf).to_frame(since=start_ms))
+    return frames
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay stored klines through the live strategy pipeline.")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--symbols", default=",".join(SYMBOLS))
+    parser.add_argument("--timeframes", default=",".join(TIMEFRAMES))
+    parser.add_argument("--store", default=".cache/history")
+    parser.add_argument("--no-fetch", action="store_true", help="only use candles already in the store")
+    parser.add_argument("--json", help="write the per-strategy report to this file")
+    args = parser.parse_args()
+
+    frames = load_frames(args.symbols.split(","), args.timeframes.split(","), args.days, args.store, not args.no_fetch)
+
+    t0 = time.time()
+    trades = run_backtest(frames, CONFIDENCE_THRESHOLD, MAX_SIGNALS_PER_RUN)
+    report = summarize(trades)
+    print(format_report(report))
+    print(f"\n{len(trades)} closed trades over {sum(len(df) for df in frames.values())} bars in {time.time() - t0:.1f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.synthetic import synthetic_klines, synthetic_symbols
+from src.data import parse_klines, add_atr
+from src.strategies import run_all_strategies
+from src.signal_builder import check_trade_exit
+from src.confidence import calculate_confidence
+from src.momentum import calculate_momentum
+from src.pipeline import frame_candidates, score_candidates, select_top
+from src.cache import SignalCache, TradeCache, StrategyHistory
+
+TIMEFRAMES = ["3m", "5m", "15m"]
+FRAME_SCALES = [9, 100, 1000]  # frames of 200 bars, the live run shape
+BAR_SCALES = [200, 5000, 50000]  # bars per frame, 9 frames
+QUICK_FRAME_SCALES = [9, 100]
+QUICK_BAR_SCALES = [200, 5000]
+TOLERANCE = 0.25  # slowdown ratio above which a case counts as a regression
+
+def make_payloads(n_frames, bars, seed):
+    symbols = synthetic_symbols(-(-n_frames // len(TIMEFRAMES)))
+    keys = [(s, tf) for s in symbols for tf in TIMEFRAMES][:n_frames]
+    return {(s, tf): synthetic_klines(s, tf, limit=bars, seed=seed) for s, tf in keys}
+
+def make_frames(payloads):
+    # Fresh DataFrames, so no case is served from the indicator cache
+    return {key: parse_klines(p) for key, p in payloads.items()}
+
+def bench_parse(payloads):
+    def run():
+        for p in payloads.values():
+            parse_klines(p)
+    return None, run
+
+def bench_add_atr(payloads):
+    frames = make_frames(payloads)
+    def run():
+        for df in frames.values():
+            add_atr(df)
+    return None, run
+
+def bench_strategies(payloads):
+    frames = {k: add_atr(df) for k, df in make_frames(payloads).items()}
+    def run():
+        for df in frames.values():
+            run_all_strategies(df)
+    return None, run
+
+def bench_confidence(payloads):
+    frames = {k: add_atr(df) for k, df in make_frames(payloads).items()}
+    signal = {'side': "LONG"}
+    def run():
+        for df in frames.values():
+            calculate_confidence(signal, df, 0.5)
+            calculate_momentum(df)
+    return None, run
+
+def bench_scoring(payloads):
+    # Every frame's candidates scored and ranked as one run's batch
+    frames = {k: add_atr(df) for k, df in make_frames(payloads).items()}
+    candidates = [c for (s, tf), df in frames.items() for c in frame_candidates(s, tf, df, {})]
+    def run():
+        select_top(score_candidates(candidates, 0.5), 3)
+    return None, run
+
+def bench_exit(payloads):
+    # One open trade per frame with levels out of reach: a full scan each
+    frames = make_frames(payloads)
+    trades = {}
+    for key, df in frames.items():
+        entry = float(df['close'].iloc[0])
+        trades[key] = {
+            'side': "LONG", 'entry': entry, 'sl': entry / 100, 'tp': [entry * 100],
+            'atr': entry, 'entry_time': int(df.index[0].value // 1_000_000)
+        }
+    def run():
+        for key, df in frames.items():
+            check_trade_exit(trades[key], df)
+    return None, run
+
+def bench_caches(payloads):
+    # A run's worth of signals per frame through all three caches, on disk
+    root = tempfile.mkdtemp(prefix="bench_cache_")
+    signals = [
+        {'slno': f"{i:02d}", 'symbol': s, 'timeframe': tf, 'side': "LONG", 'strategy': "Bench",
+         'entry': 1.0, 'sl': 0.5, 'tp': [2.0], 'confidence': 0.8}
+        for i, (s, tf) in enumerate(payloads)
+    ]
+    def run():
+        for name in os.listdir(root):
+            os.remove(os.path.join(root, name))
+        signal_cache = SignalCache(os.path.join(root, "signal_cache.json"))
+        trade_cache = TradeCache(os.path.join(root, "active_trades.json"))
+        history = StrategyHistory(os.path.join(root, "strategy_history.json"))
+        for signal in signals:
+            if not signal_cache.is_duplicate(signal):
+                signal_cache.add(signal)
+                trade_cache.add(dict(signal))
+        for signal in signals:
+            trade_cache.close(signal['slno'])
+            history.add(signal['strategy'], {'outcome': "TP1 Hit", 'profit': 1.0})
+            history.winrate(signal['strategy'])
+    return (lambda: shutil.rmtree(root, ignore_errors=True)), run
+
+CASES = [
+    ("parse_klines", bench_parse),
+    ("add_atr", bench_add_atr),
+    ("run_all_strategies", bench_strategies),
+    ("confidence_momentum", bench_confidence),
+    ("batch_scoring", bench_scoring),
+    ("check_trade_exit", bench_exit),
+    ("caches", bench_caches),
+]
+
+def time_case(setup, payloads, repeat):
+    # Best of `repeat`; each repetition gets freshly prepared inputs
+    best = float("inf")
+    for _ in range(repeat):
+        cleanup, run = setup(payloads)
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+        if cleanup:
+            cleanup()
+    return best
+
+def run_suite(frame_scales, bar_scales, repeat, seed, only=None):
+    scales = [(n, 200) for n in frame_scales] + [(9, b) for b in bar_scales if b != 200 or 9 not in frame_scales]
+    results = {}
+    for n_frames, bars in scales:
+        payloads = make_payloads(n_frames, bars, seed)
+        for name, setup in CASES:
+            if only and name not in only:
+                continue
+            # Caches do not depend on bar count
+            if name == "caches" and bars != 200:
+                continue
+            key = f"{name}[frames={n_frames},bars={bars}]"
+            seconds = time_case(setup, payloads, repeat)
+            results[key] = {"seconds": seconds, "frames": n_frames, "bars": bars}
+            print(f"{key:<48} {seconds * 1000:>10.2f} ms")
+    return results
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\n{'Case':<48} {'Base ms':>10} {'Now ms':>10} {'Ratio':>7}")
+    for key, r in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        ratio = r["seconds"] / base["seconds"] if base["seconds"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"{key:<48} {base['seconds'] * 1000:>10.2f} {r['seconds'] * 1000:>10.2f} {ratio:>7.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks on seeded synthetic klines.")
+    parser.add_argument("--quick", action="store_true", help="skip the largest scales")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cases", help="comma-separated subset of " + ",".join(name for name, _ in CASES))
+    parser.add_argument("--baseline", default="bench_baseline.json")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    frame_scales = QUICK_FRAME_SCALES if args.quick else FRAME_SCALES
+    bar_scales = QUICK_BAR_SCALES if args.quick else BAR_SCALES
+    only = set(args.cases.split(",")) if args.cases else None
+    results = run_suite(frame_scales, bar_scales, args.repeat, args.seed, only)
+
+    report = {
+        "meta": {
+            "created_at": int(time.time()), "seed": args.seed, "repeat": args.repeat,
+            "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+            "machine": platform.machine(), "processor": platform.processor(),
+        },
+        "results": results,
+    }
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
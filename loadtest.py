@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+# Full bot cycles against the local Binance/Telegram stand-in (src/standin.py)
+# at increasing symbol counts, with concurrent webhook /status traffic.
+# The stand-in and the webhook are served from their own processes on
+# loopback ports, so the bot cycle does not share an interpreter with them;
+# the bot modules are imported only after BINANCE_API/TELEGRAM_API point at
+# the stand-in.
+
+SCALES = [10, 100, 1000]
+CYCLES = 3  # the first one is a cold start with empty candle stores
+STATUS_CONCURRENCY = 20
+HOST = "127.0.0.1"
+SECRET = "loadtest"
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+def _serve_standin(port, faults, records, seed):
+    import uvicorn
+    from src.standin import create_app, Faults
+    uvicorn.run(create_app(Faults(*faults), records, seed), host=HOST, port=port, log_level="warning")
+
+def _serve_webhook(port, workdir):
+    import uvicorn
+    os.chdir(workdir)
+    from src.webhook import app
+    uvicorn.run(app, host=HOST, port=port, log_level="warning")
+
+def serve(target, port, *args):
+    import httpx
+    process = multiprocessing.Process(target=target, args=(port, *args), daemon=True)
+    process.start()
+    while True:
+        try:
+            httpx.get(f"http://{HOST}:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            if not process.is_alive():
+                raise RuntimeError(f"{target.__name__} exited with code {process.exitcode}")
+            time.sleep(0.05)
+
+def percentiles(samples):
+    import numpy as np
+    if not samples:
+        return None, None
+    return float(np.percentile(samples, 50)) * 1000, float(np.percentile(samples, 99)) * 1000
+
+async def status_traffic(url, concurrency, stop):
+    # Closed-loop clients hitting /status until `stop` is set
+    import httpx
+    latencies, errors = [], 0
+    headers = {"Authorization": f"Bearer {SECRET}"}
+    async with httpx.AsyncClient(timeout=10) as client:
+        async def worker():
+            nonlocal errors
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    r = await client.get(url, headers=headers)
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                except Exception:
+                    errors += 1
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+def standin_stats(url):
+    import httpx
+    return httpx.get(f"{url}/_stats", timeout=10).json()
+
+def run_scale(n_symbols, cycles, status_url, status_concurrency, standin_url, samples, confidence=None):
+    import runner
+    from src.synthetic import synthetic_symbols
+
+    # Fresh bot state per scale, in the directory the webhook reads from
+    runner.SYMBOLS = synthetic_symbols(n_symbols)
+    if confidence is not None:
+        runner.CONFIDENCE_THRESHOLD = confidence
+    shutil.rmtree(".cache", ignore_errors=True)
+    os.makedirs(".cache")
+    samples.clear()
+    before = standin_stats(standin_url)
+
+    stop = threading.Event()
+    traffic = {}
+    def traffic_thread():
+        traffic["result"] = asyncio.run(status_traffic(status_url, status_concurrency, stop))
+    thread = threading.Thread(target=traffic_thread, daemon=True)
+    started = time.perf_counter()
+    if status_concurrency:
+        thread.start()
+
+    state = runner.BotState()
+    cycle_times = []
+    try:
+        for _ in range(cycles):
+            start = time.perf_counter()
+            runner.run_once(state, runner.TIMEFRAMES)
+            cycle_times.append(time.perf_counter() - start)
+    finally:
+        state.close()
+        stop.set()
+    if status_concurrency:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    status_latencies, status_errors = traffic.get("result", ([], 0))
+
+    after = standin_stats(standin_url)
+    warm = sorted(cycle_times[1:]) or cycle_times
+    return {
+        "symbols": n_symbols,
+        "frames": n_symbols * len(runner.TIMEFRAMES),
+        "cold_cycle_s": cycle_times[0],
+        "warm_cycle_s": warm[len(warm) // 2],
+        "frames_per_s": n_symbols * len(runner.TIMEFRAMES) / warm[len(warm) // 2],
+        "klines_requests": after["klines"] - before["klines"],
+        "injected_errors": after["errors"] - before["errors"],
+        "injected_429": after["throttled"] - before["throttled"],
+        "weight_429": after["weight_throttled"] - before["weight_throttled"],
+        "binance_ms": percentiles(samples["binance"]),
+        "telegram_messages": after["messages"] - before["messages"],
+        "telegram_ms": percentiles(samples["telegram"]),
+        "status_requests": len(status_latencies),
+        "status_errors": status_errors,
+        "status_rps": len(status_latencies) / elapsed,
+        "status_ms": percentiles(status_latencies),
+    }
+
+def fmt_ms(pair):
+    return "-" if pair[0] is None else f"{pair[0]:.1f}/{pair[1]:.1f}"
+
+def print_report(results):
+    print(
+        f"\n{'Symbols':>7} {'Cold s':>8} {'Warm s':>8} {'Frames/s':>9} {'Klines':>7} {'Binance p50/p99 ms':>19} "
+        f"{'Msgs':>5} {'Telegram p50/p99 ms':>20} {'Status rps':>11} {'Status p50/p99 ms':>18}"
+    )
+    for r in results:
+        print(
+            f"{r['symbols']:>7} {r['cold_cycle_s']:>8.2f} {r['warm_cycle_s']:>8.2f} {r['frames_per_s']:>9.1f} "
+            f"{r['klines_requests']:>7} {fmt_ms(r['binance_ms']):>19} {r['telegram_messages']:>5} "
+            f"{fmt_ms(r['telegram_ms']):>20} {r['status_rps']:>11.1f} {fmt_ms(r['status_ms']):>18}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test full bot cycles against a local Binance/Telegram stand-in.")
+    parser.add_argument("--scales", default=",".join(str(n) for n in SCALES), help="symbol counts to run")
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    parser.add_argument("--status-concurrency", type=int, default=STATUS_CONCURRENCY, help="0 disables webhook traffic")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every stand-in response")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra uniform random latency, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of responses that are 429s")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--weight-limit", type=int, default=0, help="stand-in request weight per minute; 0 for none")
+    parser.add_argument("--records", help="CandleStore directory to serve instead of synthetic candles")
+    parser.add_argument("--confidence", type=float, help="override the runner's confidence threshold to send more signals")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    # The bot and webhook run in one temporary working directory (its .cache
+    # is wiped for each scale), so make user paths absolute first
+    records = os.path.abspath(args.records) if args.records else None
+    out = os.path.abspath(args.json) if args.json else None
+
+    standin_port, webhook_port = free_port(), free_port()
+    standin_url = f"http://{HOST}:{standin_port}"
+    os.environ.update({
+        "BINANCE_API": standin_url,
+        "TELEGRAM_API": standin_url,
+        "TELEGRAM_BOT_TOKEN": "123456:loadtest",
+        "TELEGRAM_CHAT_ID": "1",
+        "WEBHOOK_SECRET": SECRET,
+    })
+    from src.metrics import METRICS
+
+    # Keep every latency sample for exact percentiles; the histograms stay as they are
+    samples = defaultdict(list)
+    observe = METRICS.observe
+    def recording_observe(target, seconds, error=False):
+        samples[target].append(seconds)
+        observe(target, seconds, error)
+    METRICS.observe = recording_observe
+
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    os.chdir(workdir)
+    os.makedirs(".cache")
+    faults = (args.latency, args.jitter, args.error_rate, args.throttle_rate, args.retry_after, args.seed, args.weight_limit)
+    servers = [
+        serve(_serve_standin, standin_port, faults, records, args.seed),
+        serve(_serve_webhook, webhook_port, workdir),
+    ]
+    status_url = f"http://{HOST}:{webhook_port}/status"
+
+    results = []
+    try:
+        for n in [int(x) for x in args.scales.split(",")]:
+            print(f"Running {args.cycles} cycle(s) with {n} symbols...")
+            results.append(run_scale(n, args.cycles, status_url, args.status_concurrency, standin_url, samples, args.confidence))
+    finally:
+        for process in servers:
+            process.terminate()
+            process.join()
+        shutil.rmtree(workdir, ignore_errors=True)
+    print_report(results)
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
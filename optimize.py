@@ -0,0 +1,41 @@
+import argparse
+import os
+import time
+
+from src.optimizer import optimize, publish, HORIZON, MIN_TRADES
+from backtest import load_frames
+from runner import SYMBOLS, TIMEFRAMES, TUNED_FILE
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune SL/TP ATR multipliers per strategy, symbol and timeframe.")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--symbols", default=",".join(SYMBOLS))
+    parser.add_argument("--timeframes", default=",".join(TIMEFRAMES))
+    parser.add_argument("--store", default=".cache/history")
+    parser.add_argument("--no-fetch", action="store_true", help="only use candles already in the store")
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--samples", type=int, default=500, help="parameter sets per strategy for --search random")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    parser.add_argument("--min-trades", type=int, default=MIN_TRADES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=TUNED_FILE)
+    args = parser.parse_args()
+
+    frames = load_frames(args.symbols.split(","), args.timeframes.split(","), args.days, args.store, not args.no_fetch)
+
+    t0 = time.time()
+    table, evaluated = optimize(
+        frames, args.search, args.samples, args.workers, args.horizon, args.min_trades, args.seed
+    )
+    for key, entry in sorted(table.items()):
+        print(
+            f"{key:<48} SL {entry['sl']:.2f} TP {entry['tp']} | {entry['trades']} trades | "
+            f"exp {entry['default_expectancy_pct']:.3f}% -> {entry['expectancy_pct']:.3f}%"
+        )
+    print(f"\n{evaluated} parameter sets evaluated in {time.time() - t0:.1f}s, {len(table)} tuned entries")
+    publish(table, args.out, days=args.days, search=args.search, horizon=args.horizon)
+    print(f"Published to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,19 @@
 import os
+import signal as signal_module
 import sys
+import time
 import traceback
 from dotenv import load_dotenv
 
-from src.data import fetch_all_data
-from src.strategies import run_all_strategies, STRATEGY_LIST
-from src.signal_builder import build_signal, check_trade_exit
-from src.confidence import calculate_confidence
-from src.momentum import calculate_momentum, momentum_category
-from src.cache import SignalCache, TradeCache, StrategyHistory
-from src.telegram import TelegramBot
-from src.validation import is_valid_signal
+from src.cache import SignalCache, TradeCache, StrategyHistory, FrameCache
+from src.storage import atomic_write_json, safe_load_json
+from src.schedule import wait_for_close, closed_since
+from src.metrics import METRICS, RUN_LOG, TOTALS_FILE
+from src.shard import parse_shard
+
+# Heavy dependencies (pandas, ta, httpx, python-telegram-bot) are imported
+# inside the functions that need them, so a run with nothing to do exits
+# without loading them and a real run starts fetching as early as possible
 
 load_dotenv()
 
@@ -22,76 +25,339 @@ SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT"]
 TIMEFRAMES = ["3m", "5m", "15m"]
 CONFIDENCE_THRESHOLD = 0.7
 MAX_SIGNALS_PER_RUN = 3
+CANDLE_WINDOW = 1000
+# Every timeframe is resampled from one download of this interval per symbol;
+# set BASE_INTERVAL= (empty) to request each timeframe from Binance instead
+BASE_INTERVAL = os.getenv("BASE_INTERVAL", "1m") or None
+BASE_WINDOW = 4000  # base bars kept per symbol: 200 bars of the widest timeframe (15m) plus slack
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "1"))  # >1 evaluates frames in a process pool
+STATE_DB = os.getenv("STATE_DB")  # e.g. .cache/state.db to keep all state in SQLite
+CLOSE_DELAY = 0.5  # seconds after a candle close before the daemon fetches
+LAST_RUN_FILE = ".cache/last_run.json"
+TUNED_FILE = ".cache/atr_multipliers.json"  # published by optimize.py
+STREAMING_FILE = ".cache/streaming.json"  # daemon-only warm indicator state
+# "i/N": this process scans only its partition of SYMBOLS and spools the
+# results; worker 0 also coordinates the run (see src/shard.py)
+SHARD = os.getenv("SHARD")
+SPOOL_DIR = ".cache/spool"
 
-def main():
-    tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
-    signal_cache = SignalCache(".cache/signal_cache.json")
-    trade_cache = TradeCache(".cache/active_trades.json")
-    strategy_history = StrategyHistory(".cache/strategy_history.json")
+class BotState:
+    # Everything a run needs; the daemon keeps one instance warm between cycles.
+    # State files are only opened on first use, so shard workers never touch them
+    def __init__(self, resident=False):
+        self.resident = resident
+        self._signal_cache = None
+        self._trade_cache = None
+        self._strategy_history = None
+        self._frame_cache = None
+        self._tg = None
+        self._candle_store = None
+        self._pool = None
+        self._tuned = None
+        self._streaming = None
 
-    try:
-        data = fetch_all_data(SYMBOLS, TIMEFRAMES)
-        signals = []
-        for symbol in SYMBOLS:
-            for tf in TIMEFRAMES:
-                df = data.get((symbol, tf))
-                if df is None or len(df) < 100:
-                    continue
-                strat_results = run_all_strategies(df)
-                for strat in strat_results:
-                    # Historical learning: get ATR multipliers for this strategy
-                    hist = strategy_history.get(strat['strategy'])
-                    winrate = strategy_history.winrate(strat['strategy'])
-                    atr_mult = strat['atr_mult']
-                    # Adapt multipliers if winrate is high/low
-                    if winrate > 0.6:
-                        sl_mult = atr_mult['sl'] + 0.2
-                        tp_mult = [x + 0.2 for x in atr_mult['tp']]
-                    elif winrate < 0.4:
-                        sl_mult = max(atr_mult['sl'] - 0.2, 1.0)
-                        tp_mult = [max(x - 0.2, 0.8) for x in atr_mult['tp']]
-                    else:
-                        sl_mult = atr_mult['sl']
-                        tp_mult = atr_mult['tp']
-
-                    signal = build_signal(symbol, tf, df, strat, sl_mult, tp_mult, strategy_history.next_slno())
-                    if not signal:
-                        continue
-                    signal['confidence'] = calculate_confidence(signal, df, winrate)
-                    signal['momentum'] = calculate_momentum(df)
-                    signal['momentum_cat'] = momentum_category(signal['momentum'])
-                    if is_valid_signal(signal, CONFIDENCE_THRESHOLD):
-                        signals.append(signal)
+    @property
+    def signal_cache(self):
+        if self._signal_cache is None:
+            self._signal_cache = SignalCache(STATE_DB or ".cache/signal_cache.json")
+        return self._signal_cache
+
+    @property
+    def trade_cache(self):
+        if self._trade_cache is None:
+            self._trade_cache = TradeCache(STATE_DB or ".cache/active_trades.json")
+        return self._trade_cache
+
+    @property
+    def strategy_history(self):
+        if self._strategy_history is None:
+            self._strategy_history = StrategyHistory(STATE_DB or ".cache/strategy_history.json")
+            self._strategy_history.reserve(t['slno'] for t in self.trade_cache.get_all())
+        return self._strategy_history
+
+    @property
+    def frame_cache(self):
+        # Scan state rather than shared state: each shard keeps its own
+        if self._frame_cache is None:
+            self._frame_cache = FrameCache(STATE_DB or shard_path(".cache/frame_results.json"))
+        return self._frame_cache
+
+    @property
+    def streaming(self):
+        # Daemon only: warm indicators per frame, fed each closed candle once
+        if self._streaming is None and self.resident:
+            from src.streaming import StreamingFrames
+            self._streaming = StreamingFrames(STATE_DB or shard_path(STREAMING_FILE))
+        return self._streaming
+
+    @property
+    def tuned(self):
+        # Optimizer table, read once per process; empty keeps the win-rate heuristic
+        if self._tuned is None:
+            from src.signal_builder import load_tuned
+            self._tuned = load_tuned(TUNED_FILE)
+        return self._tuned
+
+    @property
+    def tg(self):
+        # Only created once there is something to send
+        if self._tg is None:
+            from src.telegram import TelegramBot
+            self._tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
+        return self._tg
+
+    @property
+    def candle_store(self):
+        if self._candle_store is None:
+            from src.candle_store import CandleStore
+            windows = {BASE_INTERVAL: BASE_WINDOW} if BASE_INTERVAL else None
+            self._candle_store = CandleStore(".cache/candles", window=CANDLE_WINDOW, windows=windows)
+        return self._candle_store
+
+    @property
+    def pool(self):
+        if self._pool is None and EVAL_WORKERS > 1:
+            from src.parallel import FramePool
+            self._pool = FramePool(EVAL_WORKERS)
+        return self._pool
+
+    def flush(self):
+        if self._tg is not None:
+            self._tg.flush()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+        if self._tg is not None:
+            self._tg.close()
+
+def scan(state, symbols, timeframes, winrates, trades):
+    # Fetch, scoring and exit checks for `symbols`; reads no state and sends
+    # nothing. Returns the valid signals and (trade, exit_info) for every
+    # open trade that closed or moved on.
+    with METRICS.stage("imports"):
+        from src.data import fetch_all_data, INTERVAL_MS
+    with METRICS.stage("fetch") as stage:
+        # Frames with open trades get request weight first
+        urgent = {(t['symbol'], t['timeframe']) for t in trades}
+        # The base series is sized for every configured timeframe, so a run
+        # with only 3m due does not leave too short a history for 15m
+        data = fetch_all_data(
+            symbols, timeframes, store=state.candle_store, base=BASE_INTERVAL, urgent=urgent, cover=TIMEFRAMES
+        )
+        stage["items"] = len(data)
+    # Already loaded in the background while fetching
+    with METRICS.stage("imports"):
+        from src.pipeline import closed_frame, last_open_time, evaluate_frame, build_candidates, score_candidates
+        from src.exits import check_trade_exits
+    # Signals are judged on closed candles only; a frame whose last closed
+    # candle is unchanged since it was evaluated reuses that evaluation
+    frames = {(symbol, tf): closed_frame(data.get((symbol, tf)), INTERVAL_MS[tf]) for symbol in symbols for tf in timeframes}
+    features = {}
+    stale = {}
+    with METRICS.stage("frame_cache") as stage:
+        for (symbol, tf), df in frames.items():
+            if df is None or not len(df):
+                continue
+            cached = state.frame_cache.get(symbol, tf, last_open_time(df))
+            if cached is not None:
+                features[(symbol, tf)] = cached
+            else:
+                stale[(symbol, tf)] = df
+        stage["items"] = len(features)
+    if state.streaming is not None:
+        # O(1) per new candle; cross-checked against ta on the live window
+        evaluated = state.streaming.evaluate(stale)
+    elif state.pool is not None:
+        evaluated = state.pool.evaluate(stale)
+    else:
+        evaluated = {key: evaluate_frame(*key, df) for key, df in stale.items()}
+    state.frame_cache.put({
+        key: (last_open_time(stale[key]), result) for key, result in evaluated.items() if result is not None
+    })
+    features.update(evaluated)
+    candidates = [
+        candidate for (symbol, tf), df in frames.items()
+        for candidate in build_candidates(symbol, tf, df, features.get((symbol, tf)), winrates, state.tuned)
+    ]
+    with METRICS.stage("score") as stage:
+        stage["items"] = len(candidates)
+        signals = score_candidates(candidates, CONFIDENCE_THRESHOLD)
 
+    exits = []
+    open_trades = {}
+    for trade in trades:
+        open_trades.setdefault((trade['symbol'], trade['timeframe']), []).append(trade)
+    for (symbol, tf), frame_trades in open_trades.items():
+        df = data.get((symbol, tf))
+        if df is None:
+            continue
+        with METRICS.stage("exit_check", (symbol, tf)) as stage:
+            stage["items"] = len(frame_trades)
+            for trade, exit_info in zip(frame_trades, check_trade_exits(frame_trades, df, INTERVAL_MS[tf])):
+                # Open trades only when how far they were checked changed
+                if exit_info['closed'] or exit_info['last_checked'] != trade.get('last_checked') \
+                        or exit_info['c2c_armed'] != trade.get('c2c_armed'):
+                    exits.append((trade, exit_info))
+    return signals, exits
+
+def apply_run(state, signals, exits):
+    # The state-owning half of a run: dedup and ranking of the scanned
+    # signals, serials, sends, and the trade/history updates of the exits
+    from src.pipeline import select_top
+    signal_cache = state.signal_cache
+    trade_cache = state.trade_cache
+    strategy_history = state.strategy_history
+
+    with METRICS.stage("dedup") as stage:
+        stage["items"] = len(signals)
         signals = [s for s in signals if not signal_cache.is_duplicate(s)]
-        signals = sorted(signals, key=lambda x: x['confidence'], reverse=True)[:MAX_SIGNALS_PER_RUN]
+        signals = select_top(signals, MAX_SIGNALS_PER_RUN)
+    # Serials only for the signals actually sent
+    for signal in signals:
+        signal['slno'] = strategy_history.next_slno()
 
+    with METRICS.stage("send") as stage:
+        stage["items"] = len(signals)
         for signal in signals:
-            tg.send_signal(signal)
+            state.tg.send_signal(signal)
             signal_cache.add(signal)
             trade_cache.add(signal)
 
-        open_trades = trade_cache.get_all()
-        for trade in open_trades:
-            df = data.get((trade['symbol'], trade['timeframe']))
-            if df is None:
-                continue
-            exit_info = check_trade_exit(trade, df)
-            if exit_info['closed']:
-                tg.send_trade_close(trade, exit_info)
-                trade_cache.close(trade['slno'])
-                # Update strategy history
-                strategy_history.add(trade['strategy'], {
-                    "entry": trade['entry'],
-                    "sl": trade['sl'],
-                    "tp": trade['tp'],
-                    "outcome": exit_info['reason'],
-                    "profit": exit_info['exit_price'] - trade['entry'] if trade['side'] == "LONG" else trade['entry'] - exit_info['exit_price'],
-                    "candles_to_win": exit_info.get('candles_to_win', None)
-                })
-
-    except Exception as e:
+    closes = []
+    checked = []
+    current = {t['slno']: t for t in trade_cache.get_all()}
+    for scanned, exit_info in exits:
+        trade = current.get(scanned['slno'])
+        if trade is None:
+            continue
+        if not exit_info['closed']:
+            # Remember how far this trade has been checked
+            trade.update(last_checked=exit_info['last_checked'], c2c_armed=exit_info['c2c_armed'])
+            checked.append(trade)
+            continue
+        closes.append((trade, exit_info))
+        trade_cache.close(trade['slno'])
+        # Update strategy history
+        strategy_history.add(trade['strategy'], {
+            "slno": trade['slno'],
+            "symbol": trade['symbol'],
+            "timeframe": trade['timeframe'],
+            "side": trade['side'],
+            "entry": trade['entry'],
+            "sl": trade['sl'],
+            "tp": trade['tp'],
+            "outcome": exit_info['reason'],
+            "profit": exit_info['exit_price'] - trade['entry'] if trade['side'] == "LONG" else trade['entry'] - exit_info['exit_price'],
+            "candles_to_win": exit_info.get('candles_to_win', None)
+        })
+    trade_cache.update(*checked)
+    with METRICS.stage("send") as stage:
+        stage["items"] = len(closes)
+        if closes:
+            state.tg.send_trade_closes(closes)
+        # Deliver this run's messages before the next cycle (or process exit)
+        state.flush()
+
+def run_cycle(state, timeframes):
+    trades = list(state.trade_cache.get_all())
+    signals, exits = scan(state, SYMBOLS, timeframes, state.strategy_history.winrates(), trades)
+    apply_run(state, signals, exits)
+
+def shard_path(path):
+    # Workers other than the coordinator keep their own run files
+    shard = parse_shard(SHARD)[0] if SHARD else 0
+    if not shard:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_shard{shard}{ext}"
+
+def run_shard(state, timeframes, shard, shards, now):
+    # Scan this worker's partition and spool the results; worker 0 then
+    # merges every shard's spool and applies the run once
+    from src.shard import partition, run_id, load_context, write_spool, wait_spools, claim, write_context, prune
+    rid = run_id(TIMEFRAMES, now)
+    symbols = partition(SYMBOLS, shard, shards)
+    if shard == 0:
+        # The coordinator owns the state and scans with it directly
+        winrates, trades = state.strategy_history.winrates(), list(state.trade_cache.get_all())
+    else:
+        winrates, trades = load_context(SPOOL_DIR)
+    mine = set(symbols)
+    signals, exits = scan(state, symbols, timeframes, winrates, [t for t in trades if t['symbol'] in mine])
+    write_spool(SPOOL_DIR, rid, shard, shards, signals, exits)
+    if shard != 0:
+        return
+    with METRICS.stage("spool_wait"):
+        payloads, missing = wait_spools(SPOOL_DIR, rid, shards)
+    if missing:
+        print(f"Shards {missing} did not report for run {rid}; ranking without them")
+    if not claim(SPOOL_DIR, rid):
+        print(f"Run {rid} was already coordinated; nothing sent")
+        return
+    # Runner order (symbol, then timeframe) so equal scores rank as in a single process
+    order = {key: i for i, key in enumerate((symbol, tf) for symbol in SYMBOLS for tf in TIMEFRAMES)}
+    signals = sorted(
+        (signal for p in payloads for signal in p['signals']),
+        key=lambda s: order.get((s['symbol'], s['timeframe']), len(order))
+    )
+    exits = [({'slno': slno}, exit_info) for p in payloads for slno, exit_info in p['exits']]
+    apply_run(state, signals, exits)
+    write_context(SPOOL_DIR, state.strategy_history.winrates(), state.trade_cache.get_all())
+    prune(SPOOL_DIR)
+
+def run_once(state, timeframes, now=None):
+    # One instrumented cycle; metrics are logged even when the cycle fails
+    started_at = time.time()
+    try:
+        if SHARD:
+            run_shard(state, timeframes, *parse_shard(SHARD), now or started_at)
+        else:
+            run_cycle(state, timeframes)
+    finally:
+        METRICS.finish_run(started_at, shard_path(RUN_LOG), shard_path(TOTALS_FILE))
+
+def main():
+    # Cron entry point: only the timeframes with a candle closed since the
+    # previous successful run are processed, and none means nothing to load
+    now = time.time()
+    last_run = shard_path(LAST_RUN_FILE)
+    prev = safe_load_json(last_run, {}).get("at")
+    due = TIMEFRAMES if prev is None else closed_since(TIMEFRAMES, prev, now)
+    if not due:
+        print("No candle closed since the last run; nothing to do.")
+        return
+    state = BotState()
+    try:
+        run_once(state, due, now)
+        atomic_write_json(last_run, {"at": now})
+    except Exception:
         err = traceback.format_exc()
-        tg.send_error(f"Bot error:\n{err}")
+        state.tg.send_error(f"Bot error:\n{err}")
         print(err)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        state.close()
+
+def run_daemon():
+    # Resident mode: wake right after each candle close and only process the
+    # timeframes that just closed, reusing caches and stored candles in memory
+    # and streaming indicators forward one closed candle at a time.
+    # SIGTERM exits like Ctrl-C, so queued messages are delivered and the
+    # process pool is shut down on the way out.
+    signal_module.signal(signal_module.SIGTERM, lambda signum, frame: sys.exit(0))
+    state = BotState(resident=True)
+    prev = time.time()
+    try:
+        while True:
+            prev, due = wait_for_close(TIMEFRAMES, prev, CLOSE_DELAY)
+            if not due:
+                continue
+            try:
+                run_once(state, due, prev)
+            except Exception:
+                err = traceback.format_exc()
+                state.tg.send_error(f"Bot error:\n{err}")
+                print(err)
+    finally:
+        state.close()
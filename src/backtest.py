@@ -0,0 +1,156 @@
+import heapq
+from collections import defaultdict, deque
+import numpy as np
+
+from src.data import INTERVAL_MS
+from src.indicators import indicators
+from src.strategies import STRATEGY_LIST, signal_matrix
+from src.signal_builder import adapt_multipliers, trade_levels
+from src.confidence import confidence_scores
+from src.momentum import momentum_scores
+from src.cache import DEDUP_WINDOW, signal_key
+from src.exits import first_touch, C2C_ARM_ATR
+
+HISTORY_WINDOW = 50  # records kept per strategy, as StrategyHistory
+EXIT_HORIZON = 1000  # bars a trade may stay open before it is left unresolved
+MIN_BARS = 100  # runner skips frames shorter than this
+
+class FrameArrays:
+    # Everything the replay reads from one frame, computed once as arrays
+    def __init__(self, symbol, tf, df):
+        ind = indicators(df)
+        self.symbol = symbol
+        self.tf = tf
+        self.close_time = df.index.asi8 // 1_000_000 + INTERVAL_MS[tf]
+        self.close = df['close'].to_numpy(dtype=float)
+        self.atr = df['ATR'].to_numpy(dtype=float)
+        self.rsi = ind.rsi(14).to_numpy(dtype=float)
+        self.momentum = momentum_scores(self.rsi, ind.stoch(14).to_numpy(dtype=float))
+        self.high = df['high'].to_numpy(dtype=float)
+        self.low = df['low'].to_numpy(dtype=float)
+        self.signals = signal_matrix(df)
+
+    def candidates(self):
+        # (bar, strategy) pairs that fired and pass the winrate-independent checks
+        fired = self.signals.copy()
+        fired[:MIN_BARS - 1] = False
+        ok = (self.atr > 0) & (self.momentum >= 40)
+        bars, strats = np.nonzero(fired & ok[:, None])
+        return bars, strats
+
+def scan_exit(fr, bar, side, entry, sl, tp, atr, horizon=EXIT_HORIZON):
+    # The live exit engine applied to the bars after the entry bar; returns
+    # (exit bar, reason, exit price) or None if still open
+    end = min(bar + 1 + horizon, len(fr.close))
+    high, low = fr.high[bar + 1:end], fr.low[bar + 1:end]
+    is_long = np.array([side == "LONG"])
+    c2c_level = entry + C2C_ARM_ATR * atr if side == "LONG" else entry - C2C_ARM_ATR * atr
+    hit, first, reasons, prices, _ = first_touch(
+        is_long, np.array([entry]), np.array([sl]), np.array([tp], dtype=float),
+        np.array([c2c_level]), np.array([False]), high, low, np.ones((1, len(high)), dtype=bool)
+    )
+    if not hit[0]:
+        return None
+    return bar + 1 + int(first[0]), reasons[0], prices[0]
+
+def run_backtest(frames, confidence_threshold=0.7, max_signals=3, horizon=EXIT_HORIZON):
+    # frames: {(symbol, tf): DataFrame with ATR}, iterated in runner order.
+    # Replays runs in close-time order with the runner's adaptation, dedup and
+    # per-run ranking; returns the closed trades in closing order.
+    arrays = [FrameArrays(symbol, tf, df) for (symbol, tf), df in frames.items() if len(df) >= MIN_BARS]
+    events = []
+    for f, fr in enumerate(arrays):
+        bars, strats = fr.candidates()
+        events.append(np.stack([fr.close_time[bars], np.full(len(bars), f), strats, bars], axis=1))
+    if not events:
+        return []
+    events = np.concatenate(events)
+    events = events[np.lexsort((events[:, 2], events[:, 1], events[:, 0]))]
+
+    history = defaultdict(lambda: deque(maxlen=HISTORY_WINDOW))
+    last_sent = {}
+    pending = []
+    closed = []
+    seq = 0
+
+    def apply_closes(until, inclusive):
+        while pending and (pending[0][0] < until or inclusive and pending[0][0] == until):
+            _, _, trade = heapq.heappop(pending)
+            history[trade['strategy']].append("TP" in trade['reason'])
+            closed.append(trade)
+
+    run_starts = np.flatnonzero(np.r_[True, events[1:, 0] != events[:-1, 0]])
+    for start, stop in zip(run_starts, np.r_[run_starts[1:], len(events)]):
+        now = int(events[start, 0])
+        apply_closes(now, False)
+        signals = []
+        for _, f, j, bar in events[start:stop]:
+            fr = arrays[f]
+            strat = STRATEGY_LIST[j]
+            hist = history[strat['name']]
+            winrate = sum(hist) / len(hist) if hist else 0.5
+            side = strat['side']
+            entry = fr.close[bar]
+            conf = float(confidence_scores(side == "LONG", fr.atr[bar] / entry * 100, fr.rsi[bar], winrate))
+            if conf < confidence_threshold:
+                continue
+            key = signal_key({'symbol': fr.symbol, 'timeframe': fr.tf, 'strategy': strat['name'], 'side': side})
+            if now // 1000 - last_sent.get(key, -DEDUP_WINDOW) < DEDUP_WINDOW:
+                continue
+            signals.append((conf, f, j, bar, winrate, key))
+        signals.sort(key=lambda x: x[0], reverse=True)
+        for conf, f, j, bar, winrate, key in signals[:max_signals]:
+            fr = arrays[f]
+            strat = STRATEGY_LIST[j]
+            side = strat['side']
+            last_sent[key] = now // 1000
+            sl_mult, tp_mult = adapt_multipliers(strat['atr_mult'], winrate)
+            sl, tp = trade_levels(side, float(fr.close[bar]), float(fr.atr[bar]), sl_mult, tp_mult)
+            entry, sl, tp = round(float(fr.close[bar]), 2), round(sl, 2), [round(x, 2) for x in tp]
+            result = scan_exit(fr, bar, side, entry, sl, tp, float(fr.atr[bar]), horizon)
+            if result is None:
+                continue
+            exit_bar, reason, price = result
+            profit = price - entry if side == "LONG" else entry - price
+            seq += 1
+            heapq.heappush(pending, (int(fr.close_time[exit_bar]), seq, {
+                'symbol': fr.symbol, 'timeframe': fr.tf, 'strategy': strat['name'], 'side': side,
+                'confidence': conf, 'entry': entry, 'exit_price': price, 'reason': reason,
+                'profit_pct': profit / entry * 100, 'bars': int(exit_bar - bar),
+                'opened_at': now, 'closed_at': int(fr.close_time[exit_bar])
+            }))
+        apply_closes(now, True)
+    apply_closes(np.iinfo(np.int64).max, True)
+    return closed
+
+def summarize(trades):
+    by_strategy = defaultdict(list)
+    for t in trades:
+        by_strategy[t['strategy']].append(t)
+    report = {}
+    for name, rows in by_strategy.items():
+        profit = np.array([t['profit_pct'] for t in rows])
+        wins = np.array(["TP" in t['reason'] for t in rows])
+        equity = np.cumsum(profit)
+        drawdown = np.maximum.accumulate(np.r_[0.0, equity])[1:] - equity
+        report[name] = {
+            'trades': len(rows),
+            'wins': int(wins.sum()),
+            'losses': sum(t['reason'] == 'SL Hit' for t in rows),
+            'cost_to_cost': sum(t['reason'] == 'Cost-to-Cost' for t in rows),
+            'win_rate': float(wins.mean()),
+            'expectancy_pct': float(profit.mean()),
+            'max_drawdown_pct': float(drawdown.max()),
+            'avg_bars_to_target': float(np.mean([t['bars'] for t in rows if "TP" in t['reason']])) if wins.any() else None,
+        }
+    return report
+
+def format_report(report):
+    lines = [f"{'Strategy':<28} {'Trades':>6} {'Win%':>6} {'Exp%':>8} {'MaxDD%':>8} {'Bars→TP':>8}"]
+    for name, r in sorted(report.items(), key=lambda x: -x[1]['expectancy_pct']):
+        bars = f"{r['avg_bars_to_target']:.1f}" if r['avg_bars_to_target'] is not None else "-"
+        lines.append(
+            f"{name:<28} {r['trades']:>6} {r['win_rate'] * 100:>6.1f} "
+            f"{r['expectancy_pct']:>8.3f} {r['max_drawdown_pct']:>8.2f} {bars:>8}"
+        )
+    return "\n".join(lines)
@@ -1,90 +1,258 @@
-import json
 import os
 import time
+from collections import deque
+from src.storage import open_table, open_log, SQLITE_SUFFIXES
 
-def safe_load_json(path, default):
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
-        with open(path, "w") as f:
-            json.dump(default, f)
-    with open(path, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            with open(path, "w") as f2:
-                json.dump(default, f2)
-            return default
+HISTORY_LIMIT = 50
+DEDUP_WINDOW = 7200  # seconds a sent signal blocks the same setup
+
+def signal_key(signal):
+    return "|".join((signal['symbol'], signal['timeframe'], signal['strategy'], signal['side']))
+
+def frame_key(symbol, tf):
+    return f"{symbol}|{tf}"
+
+def _flatten_history(data):
+    # Older strategy_history.json files map strategy -> list of records
+    if isinstance(data, dict):
+        return [dict(r, strategy=name) for name, records in data.items() for r in records]
+    return data
 
 class SignalCache:
-    def __init__(self, path):
+    # Hash index on the signal's content key plus a time-ordered expiry queue,
+    # so lookups are O(1) and only signals inside the window are kept
+    def __init__(self, path, window=DEDUP_WINDOW):
         self.path = path
-        self.cache = safe_load_json(self.path, [])
+        self.window = window
+        self.table = open_table(self.path, "signals", key="key", migrate=lambda data: [r for r in data if 'key' in r])
+        self.cache = {}
+        self.expiry = deque()
+        legacy = []
+        for record in sorted(self.table.all(), key=lambda r: r['opened_at']):
+            if 'key' not in record:
+                legacy.append(record['slno'])
+                continue
+            self.cache[record['key']] = record
+            self.expiry.append((record['opened_at'], record['key']))
+        if legacy:
+            self.table.delete(*legacy)
+        self._evict(int(time.time()))
 
     def is_duplicate(self, signal):
-        now = int(time.time())
-        for s in self.cache:
-            if s['slno'] == signal['slno'] and now - s['opened_at'] < 7200:
-                return True
-        return False
+        self._evict(int(time.time()))
+        return signal_key(signal) in self.cache
 
     def add(self, signal):
-        self.cache.append({'slno': signal['slno'], 'opened_at': int(time.time())})
-        self._save()
+        now = int(time.time())
+        record = {
+            'key': signal_key(signal), 'slno': signal['slno'], 'symbol': signal['symbol'],
+            'strategy': signal['strategy'], 'opened_at': now
+        }
+        self.cache[record['key']] = record
+        self.expiry.append((now, record['key']))
+        self.table.put(record)
+        self._evict(now)
 
-    def _save(self):
-        with open(self.path, "w") as f:
-            json.dump(self.cache, f)
+    def _evict(self, now):
+        expired = []
+        while self.expiry and now - self.expiry[0][0] >= self.window:
+            opened_at, key = self.expiry.popleft()
+            record = self.cache.get(key)
+            # A re-added key leaves a stale queue entry behind; skip it
+            if record is not None and record['opened_at'] == opened_at:
+                del self.cache[key]
+                expired.append(key)
+        if expired:
+            self.table.delete(*expired)
 
 class TradeCache:
     def __init__(self, path):
         self.path = path
-        self.trades = safe_load_json(self.path, [])
+        self.table = open_table(self.path, "trades", key="slno")
+        self.trades = self.table.all()
 
     def add(self, signal):
         if not any(t['slno'] == signal['slno'] for t in self.trades):
             self.trades.append(signal)
-            self._save()
+            self.table.put(signal)
+
+    def update(self, *trades):
+        if trades:
+            self.table.put(*trades)
 
     def close(self, slno):
         self.trades = [t for t in self.trades if t['slno'] != slno]
-        self._save()
+        self.table.delete(slno)
 
     def get_all(self):
         return self.trades
 
-    def _save(self):
-        with open(self.path, "w") as f:
-            json.dump(self.trades, f)
+class FrameCache:
+    # Evaluation results per (symbol, timeframe), valid for as long as the
+    # frame's last closed candle is the one they were computed on
+    def __init__(self, path):
+        self.path = path
+        self.table = open_table(self.path, "frames", key="key")
+        self.frames = {r['key']: r for r in self.table.all()}
+
+    def get(self, symbol, tf, closed):
+        record = self.frames.get(frame_key(symbol, tf))
+        if record is None or record['closed'] != closed:
+            return None
+        return record['features']
+
+    def put(self, results):
+        # results: {(symbol, tf): (closed, features)}
+        records = [
+            {'key': frame_key(symbol, tf), 'symbol': symbol, 'timeframe': tf, 'closed': closed, 'features': features}
+            for (symbol, tf), (closed, features) in results.items()
+        ]
+        if records:
+            self.frames.update((r['key'], r) for r in records)
+            self.table.put(*records)
+
+def _sibling(path, suffix, ext):
+    # Companion file of a JSON state file; SQLite keeps everything in one database
+    if path.endswith(SQLITE_SUFFIXES):
+        return path
+    return f"{os.path.splitext(path)[0]}_{suffix}{ext}"
+
+def aggregate_key(strategy, symbol=None, tf=None):
+    return strategy if symbol is None else "|".join((strategy, symbol, tf))
+
+def aggregate_stats(agg):
+    # Reported totals of one persisted aggregate
+    return {
+        'trades': agg['trades'], 'wins': agg['wins'], 'losses': agg['losses'],
+        'cost_to_cost': agg['cost_to_cost'], 'profit': agg['profit'],
+        'win_rate': agg['wins'] / agg['trades'],
+        'avg_candles_to_win': agg['candles_to_win'] / agg['timed_wins'] if agg['timed_wins'] else None,
+    }
+
+def _new_aggregate(name):
+    return {
+        'name': name, 'trades': 0, 'wins': 0, 'losses': 0, 'cost_to_cost': 0, 'profit': 0.0,
+        'candles_to_win': 0, 'timed_wins': 0, 'window': deque(maxlen=HISTORY_LIMIT), 'window_wins': 0
+    }
 
 class StrategyHistory:
+    # Closed-trade outcomes. The main table keeps the last HISTORY_LIMIT
+    # records per strategy (what the webhook stats read); every record also
+    # goes to an append-only archive. Running aggregates per strategy and
+    # per strategy x symbol x timeframe, with a rolling window of outcomes,
+    # are persisted in a meta table (what the webhook stats read), and the
+    # serial counter in a table of its own, so winrate and next_slno never
+    # scan records and a serial never rewrites the aggregates.
     def __init__(self, path):
         self.path = path
-        self.history = safe_load_json(self.path, {})
+        self.table = open_table(self.path, "history", migrate=_flatten_history)
+        self.archive = open_log(_sibling(path, "archive", ".jsonl"), "history_archive")
+        self.meta = open_table(_sibling(path, "meta", ".json"), "history_meta", key="name")
+        self.serial = open_table(_sibling(path, "serial", ".json"), "history_serial", key="name")
+        self.history = {}
+        for record in self.table.all():
+            self.history.setdefault(record['strategy'], []).append(record)
+        self.aggregates = {}
+        legacy_slno = None
+        for record in self.meta.all():
+            if record['name'] == "slno":
+                legacy_slno = record['value']
+            else:
+                agg = dict(record, window=deque(record['window'], maxlen=HISTORY_LIMIT))
+                self.aggregates[record['name']] = agg
+        self.last_slno = next((r['value'] for r in self.serial.all() if r['name'] == "slno"), None)
+        if self.last_slno is None and legacy_slno is None:
+            self._migrate()
+        elif self.last_slno is None:
+            # Meta tables that still hold the counter
+            self.last_slno = legacy_slno
+            self._save_slno()
+            self.meta.delete("slno")
+
+    def _migrate(self):
+        # State written before the meta table existed: archive the kept
+        # records, rebuild the aggregates from them and continue the serials
+        records = sorted(self.table.all(), key=lambda r: r.get('id', 0))
+        if records:
+            self.archive.put(*[{k: v for k, v in r.items() if k != 'id'} for r in records])
+        touched = set()
+        for record in records:
+            touched.update(self._apply(record))
+        self.last_slno = max((int(r['slno']) for r in records if str(r.get('slno', "")).isdigit()), default=0)
+        if touched:
+            self.meta.put(*[self._meta_record(k) for k in touched])
+        self._save_slno()
+
+    def _apply(self, record):
+        outcome = record.get('outcome', "")
+        win = "TP" in outcome
+        keys = [aggregate_key(record['strategy'])]
+        if record.get('symbol') and record.get('timeframe'):
+            keys.append(aggregate_key(record['strategy'], record['symbol'], record['timeframe']))
+        for key in keys:
+            agg = self.aggregates.setdefault(key, _new_aggregate(key))
+            agg['trades'] += 1
+            agg['wins'] += win
+            agg['losses'] += outcome == 'SL Hit'
+            agg['cost_to_cost'] += outcome == 'Cost-to-Cost'
+            agg['profit'] += record.get('profit') or 0.0
+            if win and record.get('candles_to_win') is not None:
+                agg['candles_to_win'] += record['candles_to_win']
+                agg['timed_wins'] += 1
+            if len(agg['window']) == HISTORY_LIMIT:
+                agg['window_wins'] -= agg['window'][0]
+            agg['window'].append(int(win))
+            agg['window_wins'] += win
+        return keys
+
+    def _meta_record(self, key):
+        agg = self.aggregates[key]
+        return dict(agg, window=list(agg['window']))
 
     def get(self, strategy):
         return self.history.get(strategy, [])
 
     def add(self, strategy, record):
-        if strategy not in self.history:
-            self.history[strategy] = []
-        self.history[strategy].append(record)
-        self.history[strategy] = self.history[strategy][-50:]
-        self._save()
-
-    def winrate(self, strategy):
-        hist = self.get(strategy)
-        if not hist:
+        record = dict(record, strategy=strategy)
+        self.archive.put(dict(record))
+        self.table.put(record)
+        hist = self.history.setdefault(strategy, [])
+        hist.append(record)
+        while len(hist) > HISTORY_LIMIT:
+            self.table.delete(hist.pop(0)['id'])
+        self.meta.put(*[self._meta_record(key) for key in self._apply(record)])
+
+    def stats(self, strategy, symbol=None, tf=None):
+        # Running totals of one strategy, or of one strategy on one frame
+        agg = self.aggregates.get(aggregate_key(strategy, symbol, tf))
+        return None if agg is None else aggregate_stats(agg)
+
+    def winrate(self, strategy, symbol=None, tf=None):
+        # Win share of the last HISTORY_LIMIT outcomes
+        agg = self.aggregates.get(aggregate_key(strategy, symbol, tf))
+        if agg is None or not agg['window']:
             return 0.5
-        wins = sum(1 for s in hist if "TP" in s.get("outcome", ""))
-        return wins / len(hist)
+        return agg['window_wins'] / len(agg['window'])
+
+    def winrates(self):
+        # winrate() of every strategy with outcomes; the rest default to 0.5
+        return {
+            key: agg['window_wins'] / len(agg['window'])
+            for key, agg in self.aggregates.items() if "|" not in key and agg['window']
+        }
+
+    def reserve(self, slnos):
+        # Serials handed out before the counter existed (open trades) are never reused
+        top = max((int(s) for s in slnos if str(s).isdigit()), default=0)
+        if top > self.last_slno:
+            self.last_slno = top
+            self._save_slno()
+
+    def _save_slno(self):
+        self.serial.put({'name': "slno", 'value': self.last_slno})
 
     def next_slno(self):
-        # Returns a 2-digit serial number as string, rolling from 01-99
-        all_slno = []
-        for v in self.history.values():
-            all_slno += [int(s.get("slno", 0)) for s in v if "slno" in s]
-        n = (max(all_slno) + 1) if all_slno else 1
-        return f"{n:02d}"
-
-    def _save(self):
-        with open(self.path, "w") as f:
-            json.dump(self.history, f)
\ No newline at end of file
+        # Monotonic serial, persisted so it survives restarts; at least 2 digits
+        self.last_slno += 1
+        self._save_slno()
+        return f"{self.last_slno:02d}"
@@ -0,0 +1,169 @@
+import os
+import numpy as np
+
+CANDLE_DTYPE = np.dtype([
+    ("open_time", "<i8"), ("open", "<f8"), ("high", "<f8"),
+    ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")
+])
+
+def rows_from_klines(data):
+    raw = np.array([k[:6] for k in data], dtype=float).reshape(-1, 6)
+    rows = np.empty(len(raw), dtype=CANDLE_DTYPE)
+    for i, name in enumerate(CANDLE_DTYPE.names):
+        rows[name] = raw[:, i]
+    return rows
+
+VALUE_COLUMNS = CANDLE_DTYPE.names[1:]
+INITIAL_SIZE = 1024  # bars allocated up front for very large capacities
+
+class CandleBuffer:
+    # Storage for the last `capacity` bars of one series: an int64 open_time
+    # array plus one contiguous float64 row per OHLCV column of `values`.
+    # Merged bars are written after the newest one; when the allocation is
+    # full the newest bars move back to the front, so merges are amortised
+    # O(1) per bar and the window is always one contiguous slice. Readers get
+    # copies (rows(), and to_frame() for pandas); only times() is a view.
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.slack = max(capacity // 4, 16)
+        self.start = 0
+        self.end = 0
+        self._times = np.empty(0, dtype=np.int64)
+        self._values = np.empty((len(VALUE_COLUMNS), 0))
+        self._resize(min(capacity + self.slack, INITIAL_SIZE))
+
+    @classmethod
+    def from_rows(cls, rows, capacity=1000):
+        buf = cls(capacity)
+        buf.extend(rows)
+        return buf
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _resize(self, size):
+        n = len(self)
+        times = np.empty(size, dtype=np.int64)
+        values = np.empty((len(VALUE_COLUMNS), size))
+        times[:n] = self._times[self.start:self.end]
+        values[:, :n] = self._values[:, self.start:self.end]
+        self._times, self._values = times, values
+        self.start, self.end = 0, n
+
+    def _make_room(self, n):
+        if self.end + n <= len(self._times):
+            return
+        keep = max(min(len(self), self.capacity - n), 0)
+        self.start = self.end - keep
+        if keep + n > len(self._times):
+            self._resize(min(max(2 * len(self._times), keep + n), self.capacity + self.slack))
+        else:
+            # Overlapping copies are safe in numpy
+            self._times[:keep] = self._times[self.start:self.end]
+            self._values[:, :keep] = self._values[:, self.start:self.end]
+            self.start, self.end = 0, keep
+
+    def extend(self, rows):
+        # rows: CANDLE_DTYPE array in open_time order, after the stored bars
+        rows = rows[-self.capacity:]
+        n = len(rows)
+        self._make_room(n)
+        self._times[self.end:self.end + n] = rows["open_time"]
+        for i, name in enumerate(VALUE_COLUMNS):
+            self._values[i, self.end:self.end + n] = rows[name]
+        self.end += n
+        self.start = max(self.start, self.end - self.capacity)
+
+    def truncate_from(self, open_time):
+        # Drops the bars opened at or after open_time
+        self.end = self.start + int(np.searchsorted(self.times(), open_time))
+
+    def clear(self):
+        self.start = self.end = 0
+
+    def _bounds(self, n=None, since=None):
+        start = self.start
+        if since is not None:
+            start += int(np.searchsorted(self.times(), since))
+        if n is not None:
+            start = max(start, self.end - n)
+        return start, self.end
+
+    def times(self, n=None, since=None):
+        start, end = self._bounds(n, since)
+        return self._times[start:end]
+
+    def first_open_time(self):
+        return int(self._times[self.start]) if len(self) else None
+
+    def last_open_time(self):
+        return int(self._times[self.end - 1]) if len(self) else None
+
+    def rows(self, n=None, since=None):
+        # Packed copy in the on-disk layout
+        start, end = self._bounds(n, since)
+        rows = np.empty(end - start, dtype=CANDLE_DTYPE)
+        rows["open_time"] = self._times[start:end]
+        for i, name in enumerate(VALUE_COLUMNS):
+            rows[name] = self._values[i, start:end]
+        return rows
+
+    def to_frame(self, n=None, since=None):
+        # pandas adapter. The OHLCV block is copied once: merges rewrite the
+        # forming bar and shift data in place, and a frame (with the
+        # indicators cached for it) must not change under its holder
+        import pandas as pd
+        start, end = self._bounds(n, since)
+        index = pd.DatetimeIndex(self._times[start:end] * 1_000_000, name="open_time")
+        return pd.DataFrame(self._values[:, start:end].copy().T, index=index, columns=list(VALUE_COLUMNS), copy=False)
+
+class CandleStore:
+    # One .npy file of packed OHLCV rows per (symbol, interval), held in
+    # memory as CandleBuffers of `window` bars (or windows[interval])
+    def __init__(self, root, window=1000, windows=None):
+        self.root = root
+        self.window = window
+        self.windows = windows or {}
+        self.series = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.root, f"{symbol}_{interval}.npy")
+
+    def load(self, symbol, interval):
+        key = (symbol, interval)
+        if key not in self.series:
+            path = self._path(symbol, interval)
+            try:
+                rows = np.load(path)
+                if rows.dtype != CANDLE_DTYPE:
+                    raise ValueError(f"unexpected dtype {rows.dtype}")
+            except (OSError, ValueError):
+                rows = np.empty(0, dtype=CANDLE_DTYPE)
+            self.series[key] = CandleBuffer.from_rows(rows, self.windows.get(interval, self.window))
+        return self.series[key]
+
+    def first_open_time(self, symbol, interval):
+        return self.load(symbol, interval).first_open_time()
+
+    def last_open_time(self, symbol, interval):
+        return self.load(symbol, interval).last_open_time()
+
+    def merge(self, symbol, interval, rows, replace=False):
+        # New rows overwrite stored bars from their first open_time on (the
+        # previously stored last bar may still have been forming)
+        buf = self.load(symbol, interval)
+        if replace:
+            buf.clear()
+        elif len(rows):
+            buf.truncate_from(rows["open_time"][0])
+        buf.extend(rows)
+        self._save(symbol, interval, buf.rows())
+        return buf
+
+    def _save(self, symbol, interval, rows):
+        path = self._path(symbol, interval)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, rows)
+        os.replace(tmp, path)
@@ -1,3 +1,6 @@
+import numpy as np
+from src.indicators import indicators
+
 def calculate_confidence(signal, df, winrate):
     score = 0.5 + (winrate - 0.5) * 0.5  # 0.25 to 0.75 based on winrate
     # ATR: lower ATR% = higher confidence
@@ -8,9 +11,18 @@ def calculate_confidence(signal, df, winrate):
     elif atr_pct < 2.5: score += 0.05
 
     # Momentum: RSI
-    from ta.momentum import RSIIndicator
-    rsi = RSIIndicator(df['close'], window=14).rsi().iloc[-1]
+    rsi = indicators(df).rsi(14).iloc[-1]
     if signal['side'] == 'LONG' and rsi > 50: score += 0.05
     if signal['side'] == 'SHORT' and rsi < 50: score += 0.05
 
-    return min(max(score, 0), 1.0)
\ No newline at end of file
+    return min(max(score, 0), 1.0)
+
+def confidence_scores(is_long, atr_pct, rsi, winrate):
+    # Array form of calculate_confidence over precomputed features
+    is_long = np.asarray(is_long, dtype=bool)
+    atr_pct = np.asarray(atr_pct, dtype=float)
+    rsi = np.asarray(rsi, dtype=float)
+    score = 0.5 + (np.asarray(winrate, dtype=float) - 0.5) * 0.5
+    score = score + np.where(atr_pct < 1.5, 0.1, np.where(atr_pct < 2.5, 0.05, 0.0))
+    score = score + np.where((is_long & (rsi > 50)) | (~is_long & (rsi < 50)), 0.05, 0.0)
+    return np.clip(score, 0, 1.0)
\ No newline at end of file
@@ -1,44 +1,372 @@
+import asyncio
+import heapq
+import importlib
+import itertools
+import os
+import time
 import httpx
-import pandas as pd
-import numpy as np
-from ta.volatility import AverageTrueRange
+from src.metrics import METRICS
 
-BINANCE_BASE = "https://api.binance.com/api/v3/klines"
+# pandas, numpy and ta are imported on first use so a run can start
+# requesting klines before they load; fetch_all_data_async imports them
+# in a thread while the first requests are in flight
+PARSER_MODULES = ("numpy", "pandas", "ta")
+
+# BINANCE_API points the bot at another host, e.g. the loadtest.py stand-in
+BINANCE_BASE = os.getenv("BINANCE_API", "https://api.binance.com") + "/api/v3/klines"
 TF_MAP = {"3m": "3m", "5m": "5m", "15m": "15m"}
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "1d": 86_400_000
+}
+MAX_KLINES_LIMIT = 1000
+FETCH_CONCURRENCY = 10
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5
+# Binance request weight per IP and minute; the scheduler keeps to a share of
+# it so other clients on the same IP (shards, backtests) still get through
+WEIGHT_LIMIT = int(os.getenv("BINANCE_WEIGHT_LIMIT", "6000"))
+WEIGHT_SHARE = 0.8
+MAX_PAUSE = 60  # longer Retry-After (e.g. an IP ban) fails the request instead of waiting
+DEFAULT_RETRY_AFTER = 5
+
+class FetchError(Exception):
+    pass
+
+def klines_weight(limit):
+    # Binance's weight for one /klines request
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+class WeightScheduler:
+    # Token bucket over request weight, refilled at the per-minute budget and
+    # clamped to what X-MBX-USED-WEIGHT-1M reports as left. When weight is
+    # short, waiting requests go out lowest priority value first; a 418/429
+    # Retry-After pauses every request.
+    def __init__(self, limit=WEIGHT_LIMIT, share=WEIGHT_SHARE):
+        self.capacity = limit * share
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.used = None  # last reported X-MBX-USED-WEIGHT-1M
+        self.waiting = []  # heap of (priority, seq)
+        self.seq = itertools.count()
+        self.loop = None
+        self.changed = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _notify(self):
+        # Wakes every waiter to re-check whether it is now at the head
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    async def acquire(self, weight, priority=0):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # asyncio.run() per fetch: events cannot outlive their loop
+            self.loop, self.changed, self.waiting = loop, asyncio.Event(), []
+        weight = min(weight, self.capacity)
+        entry = (priority, next(self.seq))
+        heapq.heappush(self.waiting, entry)
+        start = time.perf_counter()
+        try:
+            while True:
+                self._refill()
+                wait = self.resume_at - time.monotonic()
+                if self.waiting[0] == entry:
+                    if wait <= 0 and self.tokens >= weight:
+                        self.tokens -= weight
+                        return
+                    wait = max(wait, (weight - self.tokens) / self.rate)
+                else:
+                    wait = None
+                try:
+                    await asyncio.wait_for(self.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.waiting.remove(entry)
+            heapq.heapify(self.waiting)
+            self._notify()
+            waited = time.perf_counter() - start
+            if waited > 0.001:
+                METRICS.record("weight_wait", waited)
+
+    def update(self, response):
+        # Returns the Retry-After pause of a 418/429 response, else None
+        used = response.headers.get("X-MBX-USED-WEIGHT-1M")
+        if used is not None and used.isdigit():
+            self._refill()
+            self.used = int(used)
+            self.tokens = min(self.tokens, self.capacity - self.used)
+        if response.status_code not in (418, 429):
+            return None
+        try:
+            pause = float(response.headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+        except ValueError:
+            pause = DEFAULT_RETRY_AFTER
+        self.resume_at = max(self.resume_at, time.monotonic() + pause)
+        return pause
 
-def fetch_klines(symbol, interval, limit=200):
-    url = f"{BINANCE_BASE}?symbol={symbol}&interval={interval}&limit={limit}"
+# One per process, so the daemon keeps what it learned between cycles
+SCHEDULER = WeightScheduler()
+
+def preload_parsers():
+    for name in PARSER_MODULES:
+        importlib.import_module(name)
+
+def parse_klines(data):
+    # Only OHLCV is kept; the other seven kline fields are never read
+    from src.candle_store import rows_from_klines
+    return frame_from_rows(rows_from_klines(data))
+
+def frame_from_rows(rows):
+    import pandas as pd
+    df = pd.DataFrame({
+        "open": rows["open"], "high": rows["high"], "low": rows["low"],
+        "close": rows["close"], "volume": rows["volume"]
+    }, index=pd.to_datetime(rows["open_time"], unit="ms"))
+    df.index.name = "open_time"
+    return df
+
+def _klines_params(symbol, interval, limit, store):
+    # With a store, only ask for bars from the last stored (possibly still
+    # forming) candle on; fall back to a full download when the gap is too big
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    last = store.last_open_time(symbol, interval) if store is not None else None
+    if last is None or interval not in INTERVAL_MS:
+        return params, True
+    missing = (int(time.time() * 1000) - last) // INTERVAL_MS[interval] + 1
+    if missing >= min(limit, MAX_KLINES_LIMIT):
+        return params, True
+    params.update(startTime=last, limit=missing + 1)
+    return params, False
+
+def _klines_result(symbol, interval, limit, store, payload, replace):
+    from src.candle_store import rows_from_klines
+    if store is None:
+        return parse_klines(payload)
+    buf = store.merge(symbol, interval, rows_from_klines(payload), replace=replace)
+    return buf.to_frame(limit)
+
+async def _timed_get_async(client, params):
+    # Every Binance request feeds the latency/error metrics
+    start = time.perf_counter()
     try:
-        r = httpx.get(url, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        df = pd.DataFrame(data, columns=[
-            "open_time", "open", "high", "low", "close", "volume",
-            "close_time", "qav", "trades", "taker_base_vol", "taker_quote_vol", "ignore"
-        ])
-        df = df.astype({
-            "open": float, "high": float, "low": float, "close": float, "volume": float
-        })
-        df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-        df.set_index("open_time", inplace=True)
-        return df
-    except Exception as e:
+        r = await client.get(BINANCE_BASE, params=params)
+    except httpx.TransportError:
+        METRICS.observe("binance", time.perf_counter() - start, error=True)
+        raise
+    METRICS.observe("binance", time.perf_counter() - start, error=r.is_error)
+    return r
+
+def run_sync(coro):
+    # asyncio.run() for the sync wrappers; inside a running loop (an async
+    # caller, a notebook) the coroutine runs on a worker thread's own loop
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+def fetch_klines(symbol, interval, limit=200, store=None):
+    async def fetch():
+        async with httpx.AsyncClient(timeout=10) as client:
+            return await fetch_klines_async(client, symbol, interval, limit, store=store)
+    try:
+        return run_sync(fetch())
+    except FetchError as e:
+        print(f"Fetch failed for {symbol}/{interval}: {e}")
         return None
 
-def fetch_all_data(symbols, timeframes):
-    data = {}
-    for symbol in symbols:
-        for tf in timeframes:
-            df = fetch_klines(symbol, TF_MAP[tf])
-            if df is not None:
-                df = add_atr(df)
-                data[(symbol, tf)] = df
+def fetch_history(symbol, interval, start_ms, end_ms=None, store=None):
+    # Pages forward MAX_KLINES_LIMIT bars at a time; with a store, resumes
+    # from the last stored bar when it already covers start_ms
+    import numpy as np
+    from src.candle_store import rows_from_klines
+    end_ms = end_ms or int(time.time() * 1000)
+    if store is not None:
+        stored = store.load(symbol, interval).times()
+        if len(stored) and stored[0] <= start_ms:
+            start_ms = int(stored[-1])
+    async def fetch():
+        pages = []
+        async with httpx.AsyncClient(timeout=10) as client:
+            start = start_ms
+            while start < end_ms:
+                page = rows_from_klines(await _get_klines_async(client, {
+                    "symbol": symbol, "interval": interval, "startTime": start,
+                    "endTime": end_ms, "limit": MAX_KLINES_LIMIT
+                }))
+                if not len(page):
+                    break
+                pages.append(page)
+                start = int(page["open_time"][-1]) + 1
+        return pages
+    pages = run_sync(fetch())
+    rows = np.concatenate(pages) if pages else rows_from_klines([])
+    if store is not None:
+        return store.merge(symbol, interval, rows).to_frame()
+    return frame_from_rows(rows)
+
+def _retryable(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status in (418, 429) or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+def _describe(exc):
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"HTTP {exc.response.status_code}"
+    return f"{type(exc).__name__}: {exc}"
+
+async def _get_klines_async(client, params, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, priority=0, scheduler=SCHEDULER):
+    # Payload of one klines request, sent once the scheduler has the weight
+    # for it; 418/429/5xx and transport errors are retried
+    weight = klines_weight(params.get("limit", 500))
+    for attempt in range(retries):
+        await scheduler.acquire(weight, priority)
+        pause = None
+        try:
+            r = await _timed_get_async(client, params)
+            pause = scheduler.update(r)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            if attempt == retries - 1 or not _retryable(e):
+                raise FetchError(f"{_describe(e)} after {attempt + 1} attempt(s)") from e
+            if pause is not None and pause > MAX_PAUSE:
+                raise FetchError(f"{_describe(e)}, retry after {pause:.0f}s") from e
+            # A throttled retry waits out Retry-After in acquire()
+            if pause is None:
+                await asyncio.sleep(backoff * 2 ** attempt)
+
+async def fetch_klines_async(client, symbol, interval, limit=200, store=None, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, preload=None, priority=0):
+    params, replace = _klines_params(symbol, interval, limit, store)
+    payload = await _get_klines_async(client, params, retries, backoff, priority)
+    if preload is not None:
+        # Parsing waits for the background import of pandas/ta
+        await preload
+    try:
+        return _klines_result(symbol, interval, limit, store, payload, replace)
+    except Exception as e:
+        raise FetchError(f"{_describe(e)} while parsing") from e
+
+async def fetch_base_async(client, symbol, base, bars, store=None, retries=FETCH_RETRIES, backoff=FETCH_BACKOFF, preload=None, priority=0):
+    # Base-interval rows for resampling. With a store only the bars after the
+    # stored ones are requested, unless the stored series does not reach
+    # back `bars` bars (e.g. an earlier run needed fewer); a full download of
+    # `bars` bars is paged MAX_KLINES_LIMIT at a time. Returns the fetched
+    # rows and whether they replaced the stored series.
+    params, replace = _klines_params(symbol, base, bars, store)
+    step = INTERVAL_MS[base]
+    now = int(time.time() * 1000)
+    start = (now // step - bars + 1) * step
+    if not replace and store.first_open_time(symbol, base) > start:
+        replace = True
+    if replace:
+        payload = []
+        for page in range(start, now + 1, MAX_KLINES_LIMIT * step):
+            payload += await _get_klines_async(client, {
+                "symbol": symbol, "interval": base, "startTime": page, "limit": MAX_KLINES_LIMIT
+            }, retries, backoff, priority)
+    else:
+        payload = await _get_klines_async(client, params, retries, backoff, priority)
+    if preload is not None:
+        await preload
+    from src.candle_store import rows_from_klines
+    try:
+        rows = rows_from_klines(payload)
+        if store is not None:
+            store.merge(symbol, base, rows, replace=replace)
+        return rows, replace
+    except Exception as e:
+        raise FetchError(f"{_describe(e)} while parsing") from e
+
+def resampled_frame(symbol, base, tf, limit, store, rows, rebuild=False):
+    # Without a store the fetched base rows are all there is
+    from src.resample import resample_rows, update_resampled
+    if store is None:
+        return frame_from_rows(resample_rows(rows, INTERVAL_MS[tf])[-limit:])
+    return update_resampled(store, symbol, base, tf, INTERVAL_MS[tf], rebuild).to_frame(limit)
+
+def frame_priority(symbol, tf, urgent, now_ms):
+    # Lower goes first when weight is short: frames with open trades, then
+    # the ones whose candle closed most recently
+    return (0 if (symbol, tf) in urgent else 1, now_ms % INTERVAL_MS[tf])
+
+async def fetch_all_data_async(symbols, timeframes, store=None, concurrency=FETCH_CONCURRENCY, base=None, limit=200, urgent=(), cover=None):
+    # One pooled keep-alive client, at most `concurrency` requests in flight.
+    # With `base` (e.g. "1m") each symbol is fetched once at that interval and
+    # every timeframe is resampled from it locally, keeping enough base bars
+    # for every timeframe in `cover` (default: `timeframes`), not just the
+    # ones due now; otherwise each timeframe is its own request. Requests are started, and given weight, in
+    # frame_priority order.
+    data, errors = {}, {}
+    now_ms = int(time.time() * 1000)
+    priority = {(s, tf): frame_priority(s, tf, urgent, now_ms) for s in symbols for tf in timeframes}
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=10, limits=limits) as client:
+        preload = asyncio.create_task(asyncio.to_thread(preload_parsers))
+        async def fetch_one(symbol, tf):
+            async with sem:
+                try:
+                    df = await fetch_klines_async(client, symbol, TF_MAP[tf], limit, store=store, preload=preload, priority=priority[(symbol, tf)])
+                except FetchError as e:
+                    errors[(symbol, tf)] = str(e)
+                    return
+            with METRICS.stage("indicators", (symbol, tf)):
+                data[(symbol, tf)] = add_atr(df)
+        async def fetch_symbol(symbol, first):
+            from src.resample import base_bars
+            bars = base_bars(limit, [INTERVAL_MS[tf] for tf in cover or timeframes], INTERVAL_MS[base])
+            async with sem:
+                try:
+                    rows, replaced = await fetch_base_async(client, symbol, base, bars, store=store, preload=preload, priority=first)
+                except FetchError as e:
+                    for tf in timeframes:
+                        errors[(symbol, tf)] = str(e)
+                    return
+            for tf in timeframes:
+                with METRICS.stage("resample", (symbol, tf)):
+                    # A re-downloaded base series may reach further back than the stored tf one
+                    df = resampled_frame(symbol, base, tf, limit, store, rows, rebuild=replaced)
+                with METRICS.stage("indicators", (symbol, tf)):
+                    data[(symbol, tf)] = add_atr(df)
+        # The semaphore admits waiters in arrival order
+        if base:
+            firsts = {s: min(priority[(s, tf)] for tf in timeframes) for s in symbols}
+            await asyncio.gather(*(fetch_symbol(s, firsts[s]) for s in sorted(symbols, key=firsts.get)))
+        else:
+            await asyncio.gather(*(fetch_one(s, tf) for s, tf in sorted(priority, key=priority.get)))
+    return data, errors
+
+def fetch_all_data(symbols, timeframes, errors=None, store=None, base=None, urgent=(), cover=None):
+    data, failed = run_sync(fetch_all_data_async(symbols, timeframes, store=store, base=base, urgent=urgent, cover=cover))
+    for (symbol, tf), err in failed.items():
+        print(f"Fetch failed for {symbol}/{tf}: {err}")
+    if errors is not None:
+        errors.update(failed)
     return data
 
 def add_atr(df, period=14):
+    import numpy as np
+    from src.indicators import indicators
     try:
-        atr = AverageTrueRange(df['high'], df['low'], df['close'], window=period).average_true_range()
-        df['ATR'] = atr
+        df['ATR'] = indicators(df).atr(period)
     except Exception:
         df['ATR'] = np.nan
     return df
\ No newline at end of file
@@ -0,0 +1,105 @@
+import time
+import numpy as np
+
+# Batch exit engine: every open trade of one frame is checked at once against
+# the closed candles it has not seen yet, using bar highs/lows to find which
+# level was touched first. Within a single bar the conservative order is
+# cost-to-cost, then SL, then TP (for an armed trade price must cross entry
+# before it can reach SL).
+
+C2C_ARM_ATR = 0.5  # favourable move, in entry ATRs, that arms cost-to-cost
+
+def first_touch(is_long, entry, sl, tp, c2c_level, armed, high, low, valid):
+    # Arrays: trades (T,) / tp (T, n) / bars high, low (B,) / valid (T, B).
+    # Returns (hit, first bar, reason, exit price, armed after the window)
+    if not len(high):
+        none = [None] * len(entry)
+        return np.zeros(len(entry), dtype=bool), np.zeros(len(entry), dtype=int), none, none, armed.copy()
+    is_long = is_long[:, None]
+    H, L = high[None, :], low[None, :]
+    favourable = np.where(is_long, H >= c2c_level[:, None], L <= c2c_level[:, None]) & valid
+    seen = np.logical_or.accumulate(favourable, axis=1)
+    armed_before = armed[:, None] | np.concatenate([np.zeros((len(entry), 1), dtype=bool), seen[:, :-1]], axis=1)
+    c2c_hit = armed_before & np.where(is_long, L <= entry[:, None], H >= entry[:, None]) & valid
+    sl_hit = np.where(is_long, L <= sl[:, None], H >= sl[:, None]) & valid
+    # (T, n, B); NaN-padded targets never compare true
+    tp_hit = np.where(is_long[:, :, None], H[:, None, :] >= tp[:, :, None], L[:, None, :] <= tp[:, :, None]) & valid[:, None, :]
+    any_hit = c2c_hit | sl_hit | tp_hit.any(axis=1)
+
+    hit = any_hit.any(axis=1)
+    first = any_hit.argmax(axis=1)
+    rows = np.arange(len(entry))
+    reasons, prices = [], []
+    for t in rows:
+        k = first[t]
+        if not hit[t]:
+            reasons.append(None)
+            prices.append(None)
+        elif c2c_hit[t, k]:
+            reasons.append('Cost-to-Cost')
+            prices.append(float(entry[t]))
+        elif sl_hit[t, k]:
+            reasons.append('SL Hit')
+            prices.append(float(sl[t]))
+        else:
+            # Highest target reached on the exit bar
+            j = np.flatnonzero(tp_hit[t, :, k])[-1]
+            reasons.append(f'TP{j + 1} Hit')
+            prices.append(float(tp[t, j]))
+    armed_after = armed | seen[:, -1]
+    return hit, first, reasons, prices, armed_after
+
+def _trade_arrays(trades, interval_ms):
+    n_tp = max(len(t['tp']) for t in trades)
+    is_long = np.array([t['side'] == "LONG" for t in trades])
+    entry = np.array([t['entry'] for t in trades], dtype=float)
+    sl = np.array([t['sl'] for t in trades], dtype=float)
+    tp = np.full((len(trades), n_tp), np.nan)
+    for i, t in enumerate(trades):
+        tp[i, :len(t['tp'])] = t['tp']
+    # Older trades carry neither the entry ATR nor the entry bar: derive them
+    atr = np.array([
+        t.get('atr') or abs(t['entry'] - t['sl']) / (t.get('sl_multiplier') or 1.0) for t in trades
+    ], dtype=float)
+    entry_time = np.array([
+        t.get('entry_time') or t['opened_at'] * 1000 // interval_ms * interval_ms for t in trades
+    ], dtype=np.int64)
+    last_checked = np.array([t.get('last_checked') or et for t, et in zip(trades, entry_time)], dtype=np.int64)
+    armed = np.array([bool(t.get('c2c_armed')) for t in trades])
+    c2c_level = np.where(is_long, entry + C2C_ARM_ATR * atr, entry - C2C_ARM_ATR * atr)
+    return is_long, entry, sl, tp, c2c_level, armed, entry_time, last_checked
+
+def check_trade_exits(trades, df, interval_ms, now_ms=None):
+    # One exit_info per trade. Open trades report the candle they were checked
+    # up to and whether cost-to-cost is armed, for the caller to persist.
+    if not trades:
+        return []
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    open_time = df.index.asi8 // 1_000_000
+    closed = open_time + interval_ms <= now_ms
+    open_time = open_time[closed]
+    high = df['high'].to_numpy(dtype=float)[closed]
+    low = df['low'].to_numpy(dtype=float)[closed]
+
+    is_long, entry, sl, tp, c2c_level, armed, entry_time, last_checked = _trade_arrays(trades, interval_ms)
+    start = np.searchsorted(open_time, last_checked.min(), side="right")
+    open_time, high, low = open_time[start:], high[start:], low[start:]
+    valid = open_time[None, :] > last_checked[:, None]
+    hit, first, reasons, prices, armed_after = first_touch(is_long, entry, sl, tp, c2c_level, armed, high, low, valid)
+
+    results = []
+    for t in range(len(trades)):
+        if hit[t]:
+            exit_time = int(open_time[first[t]])
+            info = {'closed': True, 'reason': reasons[t], 'exit_price': prices[t], 'exit_time': exit_time}
+            if reasons[t].startswith('TP'):
+                info['candles_to_win'] = int((exit_time - entry_time[t]) // interval_ms)
+            results.append(info)
+        else:
+            checked = int(open_time[-1]) if len(open_time) else int(last_checked[t])
+            results.append({
+                'closed': False,
+                'last_checked': max(checked, int(last_checked[t])),
+                'c2c_armed': bool(armed_after[t])
+            })
+    return results
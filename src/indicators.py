@@ -0,0 +1,95 @@
+import weakref
+from ta.trend import EMAIndicator, MACD
+from ta.momentum import RSIIndicator, StochasticOscillator
+from ta.volatility import AverageTrueRange, BollingerBands
+
+# One cache per frame object, keyed by id() and dropped when the frame is collected
+_CACHES = {}
+
+class IndicatorCache:
+    def __init__(self, df):
+        self._df = weakref.ref(df)
+        self._stamp = self._make_stamp(df)
+        self._values = {}
+
+    @staticmethod
+    def _make_stamp(df):
+        return (len(df), df.index[-1] if len(df) else None)
+
+    def get(self, key, compute):
+        df = self._df()
+        stamp = self._make_stamp(df)
+        if stamp != self._stamp:
+            # Frame grew or was replaced in place: everything is stale
+            self._values.clear()
+            self._stamp = stamp
+        if key not in self._values:
+            self._values[key] = compute(df)
+        return self._values[key]
+
+    def rsi(self, window=14):
+        return self.get(("rsi", window), lambda df: RSIIndicator(df['close'], window=window).rsi())
+
+    def ema(self, window):
+        return self.get(("ema", window), lambda df: EMAIndicator(df['close'], window=window).ema_indicator())
+
+    def macd_diff(self, slow=26, fast=12, sign=9):
+        return self.get(("macd_diff", slow, fast, sign), lambda df: MACD(df['close'], window_slow=slow, window_fast=fast, window_sign=sign).macd_diff())
+
+    def _stoch(self, window, smooth):
+        return self.get(("stoch", window, smooth), lambda df: StochasticOscillator(df['high'], df['low'], df['close'], window=window, smooth_window=smooth))
+
+    def stoch(self, window=14, smooth=3):
+        return self.get(("stoch_k", window, smooth), lambda df: self._stoch(window, smooth).stoch())
+
+    def stoch_signal(self, window=14, smooth=3):
+        return self.get(("stoch_d", window, smooth), lambda df: self._stoch(window, smooth).stoch_signal())
+
+    def _bollinger(self, window, dev):
+        return self.get(("bb", window, dev), lambda df: BollingerBands(df['close'], window=window, window_dev=dev))
+
+    def bb_hband(self, window=20, dev=2):
+        return self.get(("bb_h", window, dev), lambda df: self._bollinger(window, dev).bollinger_hband())
+
+    def bb_lband(self, window=20, dev=2):
+        return self.get(("bb_l", window, dev), lambda df: self._bollinger(window, dev).bollinger_lband())
+
+    def bb_width(self, window=20, dev=2):
+        return self.get(("bb_w", window, dev), lambda df: self.bb_hband(window, dev) - self.bb_lband(window, dev))
+
+    def bb_width_mean(self, window=20, dev=2, mean_window=20):
+        return self.get(("bb_w_mean", window, dev, mean_window), lambda df: self.bb_width(window, dev).rolling(mean_window).mean())
+
+    def atr(self, window=14):
+        return self.get(("atr", window), lambda df: AverageTrueRange(df['high'], df['low'], df['close'], window=window).average_true_range())
+
+    def rolling_mean(self, col, window):
+        return self.get(("mean", col, window), lambda df: df[col].rolling(window).mean())
+
+    def rolling_max(self, col, window):
+        return self.get(("max", col, window), lambda df: df[col].rolling(window).max())
+
+    def rolling_min(self, col, window):
+        return self.get(("min", col, window), lambda df: df[col].rolling(window).min())
+
+    def vwap_series(self, window=None):
+        # VWAP of each bar over the `window` bars ending at it (all bars so far
+        # without one); the last value is the VWAP of a frame of that length
+        def compute(df):
+            pv = df['close'] * df['volume']
+            vol = df['volume']
+            if window is None:
+                pv, vol = pv.cumsum(), vol.cumsum()
+            else:
+                pv, vol = pv.rolling(window, min_periods=1).sum(), vol.rolling(window, min_periods=1).sum()
+            return (pv / vol).where(vol != 0, df['close'])
+        return self.get(("vwap_series", window), compute)
+
+def indicators(df):
+    key = id(df)
+    cache = _CACHES.get(key)
+    if cache is None or cache._df() is not df:
+        cache = IndicatorCache(df)
+        _CACHES[key] = cache
+        weakref.finalize(df, _CACHES.pop, key, None)
+    return cache
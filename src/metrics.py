@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.storage import atomic_write_json
+
+# Process-wide run instrumentation. Stages record wall time, calls and items,
+# also per (symbol, timeframe); outbound requests record latency histograms.
+# finish_run() appends the run to a rolling JSON-lines log and folds it into
+# cumulative totals that the webhook exposes in Prometheus text format.
+# Both files accumulate across runs only where .cache persists: the daemon,
+# a cron host, or the Actions workflow's cache step.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RUN_LOG = ".cache/run_metrics.jsonl"
+RUN_LOG_LIMIT = 1000  # runs kept in the rolling log
+TOTALS_FILE = ".cache/metrics.json"
+PREFIX = "signal_bot"
+
+def _new_run():
+    return {"stages": {}, "frames": {}, "latency": {}}
+
+def _new_latency():
+    return {"count": 0, "errors": 0, "seconds": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)}
+
+def _add_stage(stages, name, seconds, calls, items):
+    s = stages.setdefault(name, [0.0, 0, 0])
+    s[0] += seconds
+    s[1] += calls
+    s[2] += items
+
+def _add_latency(latency, target, other):
+    l = latency.setdefault(target, _new_latency())
+    l["count"] += other["count"]
+    l["errors"] += other["errors"]
+    l["seconds"] += other["seconds"]
+    l["buckets"] = [a + b for a, b in zip(l["buckets"], other["buckets"])]
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.run = _new_run()
+
+    @contextmanager
+    def stage(self, name, frame=None):
+        # Yields a dict; set "items" on it to count what the stage processed
+        info = {"items": 0}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.record(name, time.perf_counter() - start, frame, info["items"])
+
+    def record(self, name, seconds, frame=None, items=0):
+        with self._lock:
+            _add_stage(self.run["stages"], name, seconds, 1, items)
+            if frame is not None:
+                f = self.run["frames"].setdefault("/".join(frame), {})
+                f[name] = f.get(name, 0.0) + seconds
+
+    def observe(self, target, seconds, error=False):
+        # One outbound request (or attempt) to `target`
+        sample = _new_latency()
+        sample["count"] = 1
+        sample["errors"] = int(error)
+        sample["seconds"] = seconds
+        sample["buckets"] = [int(seconds <= b) for b in LATENCY_BUCKETS]
+        with self._lock:
+            _add_latency(self.run["latency"], target, sample)
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.run))
+
+    def drain(self):
+        # Returns the current run's records and starts a new run
+        with self._lock:
+            run, self.run = self.run, _new_run()
+        return run
+
+    def merge(self, run):
+        # Folds in records drained in another process (pool workers)
+        with self._lock:
+            for name, (seconds, calls, items) in run["stages"].items():
+                _add_stage(self.run["stages"], name, seconds, calls, items)
+            for frame, stages in run["frames"].items():
+                f = self.run["frames"].setdefault(frame, {})
+                for name, seconds in stages.items():
+                    f[name] = f.get(name, 0.0) + seconds
+            for target, l in run["latency"].items():
+                _add_latency(self.run["latency"], target, l)
+
+    def finish_run(self, started_at, log_path=RUN_LOG, totals_path=TOTALS_FILE):
+        record = dict(self.drain(), started_at=started_at, duration=time.time() - started_at)
+        _append_rolling(log_path, record)
+        totals = load_totals(totals_path) or {"runs": 0, "stages": {}, "latency": {}}
+        totals["runs"] += 1
+        for name, (seconds, calls, items) in record["stages"].items():
+            _add_stage(totals["stages"], name, seconds, calls, items)
+        for target, l in record["latency"].items():
+            _add_latency(totals["latency"], target, l)
+        totals["last_run"] = {"started_at": started_at, "duration": record["duration"], "frames": record["frames"]}
+        atomic_write_json(totals_path, totals)
+        return record
+
+METRICS = Metrics()
+
+def _append_rolling(path, record):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    with open(path, "r") as f:
+        lines = f.readlines()
+    if len(lines) > RUN_LOG_LIMIT:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.writelines(lines[-RUN_LOG_LIMIT:])
+        os.replace(tmp, path)
+
+def load_totals(path=TOTALS_FILE):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _latency_lines(latency, source):
+    lines = []
+    for target, l in sorted(latency.items()):
+        labels = f'source="{source}",target="{target}"'
+        # buckets are already cumulative: each counts samples <= its bound
+        for bound, n in zip(LATENCY_BUCKETS, l["buckets"]):
+            lines.append(f'{PREFIX}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {n}')
+        lines.append(f'{PREFIX}_request_duration_seconds_bucket{{{labels},le="+Inf"}} {l["count"]}')
+        lines.append(f'{PREFIX}_request_duration_seconds_sum{{{labels}}} {l["seconds"]}')
+        lines.append(f'{PREFIX}_request_duration_seconds_count{{{labels}}} {l["count"]}')
+        lines.append(f'{PREFIX}_request_errors_total{{{labels}}} {l["errors"]}')
+    return lines
+
+def prometheus_text(totals, live=None):
+    # totals: runner totals from TOTALS_FILE; live: this process's undrained run
+    lines = [
+        f"# TYPE {PREFIX}_runs_total counter",
+        f"# TYPE {PREFIX}_stage_seconds_total counter",
+        f"# TYPE {PREFIX}_stage_calls_total counter",
+        f"# TYPE {PREFIX}_stage_items_total counter",
+        f"# TYPE {PREFIX}_request_duration_seconds histogram",
+        f"# TYPE {PREFIX}_request_errors_total counter",
+        f"# TYPE {PREFIX}_last_run_duration_seconds gauge",
+        f"# TYPE {PREFIX}_last_run_frame_seconds gauge",
+    ]
+    if totals:
+        lines.append(f"{PREFIX}_runs_total {totals['runs']}")
+        for name, (seconds, calls, items) in sorted(totals["stages"].items()):
+            lines.append(f'{PREFIX}_stage_seconds_total{{stage="{name}"}} {seconds}')
+            lines.append(f'{PREFIX}_stage_calls_total{{stage="{name}"}} {calls}')
+            lines.append(f'{PREFIX}_stage_items_total{{stage="{name}"}} {items}')
+        lines += _latency_lines(totals["latency"], "runner")
+        last = totals.get("last_run")
+        if last:
+            lines.append(f"{PREFIX}_last_run_duration_seconds {last['duration']}")
+            for frame, stages in sorted(last["frames"].items()):
+                symbol, tf = frame.split("/")
+                for name, seconds in sorted(stages.items()):
+                    lines.append(
+                        f'{PREFIX}_last_run_frame_seconds{{symbol="{symbol}",timeframe="{tf}",stage="{name}"}} {seconds}'
+                    )
+    if live:
+        lines += _latency_lines(live["latency"], "webhook")
+    return "\n".join(lines) + "\n"
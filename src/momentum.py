@@ -1,10 +1,15 @@
-from ta.momentum import RSIIndicator, StochasticOscillator
+import numpy as np
+from src.indicators import indicators
 
 def calculate_momentum(df):
-    rsi = RSIIndicator(df['close'], window=14).rsi().iloc[-1]
-    stoch = StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch().iloc[-1]
+    rsi = indicators(df).rsi(14).iloc[-1]
+    stoch = indicators(df).stoch(14).iloc[-1]
     return int((rsi + stoch) / 2)
 
+def momentum_scores(rsi, stoch):
+    # Array form of calculate_momentum; NaN where the inputs are still warming up
+    return np.trunc((np.asarray(rsi, dtype=float) + np.asarray(stoch, dtype=float)) / 2)
+
 def momentum_category(val):
     if val < 40:
         return "LOW"
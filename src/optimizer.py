@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from src.backtest import FrameArrays
+from src.exits import C2C_ARM_ATR
+from src.signal_builder import multiplier_key
+from src.strategies import STRATEGY_LIST
+from src.storage import atomic_write_json
+
+# Searches SL/TP ATR multipliers per (strategy, symbol, timeframe) over
+# stored candles. Every entry a strategy would have taken is replayed with
+# the live exit rules for each parameter set; the set with the best mean
+# profit per trade is published if it beats the strategy's defaults.
+# Close/high/low/ATR of all frames sit in one read-only shared block; each
+# task is one (frame, strategy) whose forward price windows are built once
+# and reused for every parameter set.
+
+HORIZON = 300  # bars an entry may stay open; unresolved entries are ignored
+MIN_TRADES = 20  # resolved entries needed before a table entry is published
+SL_GRID = np.round(np.arange(0.8, 2.55, 0.1), 2)
+TP_SCALE_GRID = np.round(np.arange(0.5, 2.05, 0.1), 2)  # applied to the default targets
+COLUMNS = ("close", "high", "low", "atr")
+TUNED_FILE = ".cache/atr_multipliers.json"
+
+def grid_params(atr_mult):
+    return [(float(sl), [round(m * k, 2) for m in atr_mult['tp']]) for sl in SL_GRID for k in TP_SCALE_GRID]
+
+def random_params(atr_mult, samples, rng):
+    # Increasing targets, as the defaults are
+    params = []
+    for _ in range(samples):
+        sl = round(float(rng.uniform(SL_GRID[0], SL_GRID[-1])), 2)
+        tp = np.cumsum(rng.uniform(0.2, 1.5, len(atr_mult['tp']))) + rng.uniform(0.3, 1.5)
+        params.append((sl, [round(float(x), 2) for x in tp]))
+    return params
+
+def pack_arrays(arrays):
+    total = sum(len(fr.close) for fr in arrays)
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * len(COLUMNS) * 8)
+    block = np.ndarray((len(COLUMNS), total), dtype=np.float64, buffer=shm.buf)
+    specs = []
+    offset = 0
+    for fr in arrays:
+        n = len(fr.close)
+        block[:, offset:offset + n] = (fr.close, fr.high, fr.low, fr.atr)
+        specs.append((offset, n))
+        offset += n
+    return shm, total, specs
+
+_attached = {}
+
+def _attach(name, total):
+    if name not in _attached:
+        for old in _attached.values():
+            old[0].close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        block = np.ndarray((len(COLUMNS), total), dtype=np.float64, buffer=shm.buf)
+        block.flags.writeable = False
+        _attached[name] = (shm, block)
+    return _attached[name][1]
+
+def entry_windows(close, high, low, atr, bars, is_long, horizon):
+    # Forward moves of every entry in entry ATRs, built once per task and
+    # shared by all of its parameter sets: favourable/adverse excursion per
+    # bar, their running maxima and the first bar cost-to-cost would close at
+    pad = np.full(horizon, np.nan)
+    high_w = np.lib.stride_tricks.sliding_window_view(np.r_[high, pad], horizon)[bars + 1]
+    low_w = np.lib.stride_tricks.sliding_window_view(np.r_[low, pad], horizon)[bars + 1]
+    entry, scale = close[bars][:, None], atr[bars][:, None]
+    if is_long:
+        up, down = (high_w - entry) / scale, (entry - low_w) / scale
+    else:
+        up, down = (entry - low_w) / scale, (high_w - entry) / scale
+    # NaN padding past the end of the data never counts as a touch
+    up, down = np.nan_to_num(up, nan=-np.inf), np.nan_to_num(down, nan=-np.inf)
+    up_max = np.maximum.accumulate(up, axis=1)
+    down_max = np.maximum.accumulate(down, axis=1)
+    armed_before = np.zeros(up.shape, dtype=bool)
+    armed_before[:, 1:] = up_max[:, :-1] >= C2C_ARM_ATR
+    c2c_first = first_index(armed_before & (down >= 0))
+    return close[bars] / atr[bars], up, up_max, down_max, c2c_first
+
+def first_index(mask):
+    # First True per row, or the row length when there is none
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+def evaluate_params(windows, sl_mult, tp_mult):
+    # (resolved trades, wins, mean profit %) of one parameter set under the
+    # live exit rules: per bar cost-to-cost first, then SL, then the highest
+    # target reached
+    entry_atr, up, up_max, down_max, c2c_first = windows
+    tp = np.asarray(tp_mult, dtype=float)
+    sl_first = first_index(down_max >= sl_mult)
+    tp_first = first_index(up_max >= tp.min())
+    first = np.minimum(c2c_first, np.minimum(sl_first, tp_first))
+    hit = first < up.shape[1]
+    if not hit.any():
+        return 0, 0, 0.0
+    rows = np.flatnonzero(hit)
+    first = first[rows]
+    reached = up[rows, first][:, None] >= tp[None, :]
+    target = np.where(reached, tp[None, :], -np.inf).max(axis=1)
+    units = np.where(c2c_first[rows] == first, 0.0, np.where(sl_first[rows] == first, -sl_mult, target))
+    profit = units / entry_atr[rows] * 100
+    return len(rows), int((units > 0).sum()), float(profit.mean())
+
+def _search(task):
+    name, total, offset, n, bars, strategy_index, params, horizon = task
+    close, high, low, atr = _attach(name, total)[:, offset:offset + n]
+    is_long = STRATEGY_LIST[strategy_index]['side'] == "LONG"
+    windows = entry_windows(close, high, low, atr, bars, is_long, horizon)
+    return [evaluate_params(windows, sl, tp) for sl, tp in params]
+
+def optimize(frames, search="grid", samples=500, workers=None, horizon=HORIZON, min_trades=MIN_TRADES, seed=0):
+    # frames: {(symbol, tf): DataFrame with ATR}. Returns the tuned table
+    # {multiplier_key: entry} and the number of parameter sets evaluated
+    rng = np.random.default_rng(seed)
+    keys = list(frames)
+    arrays = [FrameArrays(symbol, tf, frames[(symbol, tf)]) for symbol, tf in keys]
+    shm, total, specs = pack_arrays(arrays)
+    tasks, meta = [], []
+    try:
+        for f, fr in enumerate(arrays):
+            bars, strats = fr.candidates()
+            for j, strat in enumerate(STRATEGY_LIST):
+                entry_bars = bars[strats == j]
+                if len(entry_bars) < min_trades:
+                    continue
+                params = [(strat['atr_mult']['sl'], list(strat['atr_mult']['tp']))]
+                if search == "grid":
+                    params += grid_params(strat['atr_mult'])
+                else:
+                    params += random_params(strat['atr_mult'], samples, rng)
+                tasks.append((shm.name, total, *specs[f], entry_bars, j, params, horizon))
+                meta.append((keys[f], strat['name'], strat['side'], params))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search, tasks))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    table = {}
+    evaluated = 0
+    for ((symbol, tf), strategy, side, params), scores in zip(meta, results):
+        evaluated += len(params)
+        default = scores[0]
+        best = max(range(1, len(params)), key=lambda i: (scores[i][0] >= min_trades, scores[i][2]))
+        trades, wins, expectancy = scores[best]
+        if trades < min_trades or expectancy <= default[2]:
+            continue
+        sl, tp = params[best]
+        table[multiplier_key(strategy, side, symbol, tf)] = {
+            'sl': sl, 'tp': tp, 'trades': trades, 'win_rate': wins / trades,
+            'expectancy_pct': expectancy, 'default_expectancy_pct': default[2]
+        }
+    return table, evaluated
+
+def publish(table, path=TUNED_FILE, **meta):
+    atomic_write_json(path, {'generated_at': int(time.time()), **meta, 'multipliers': table})
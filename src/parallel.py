@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from src.pipeline import evaluate_frame
+from src.metrics import METRICS
+
+# Frames travel to workers as rows of one shared float64 block; only the
+# block name and (offset, length) per frame are pickled
+COLUMNS = ("open_time", "open", "high", "low", "close", "volume", "ATR")
+
+def pack_frames(frames):
+    total = sum(len(df) for df in frames.values())
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * len(COLUMNS) * 8)
+    block = np.ndarray((total, len(COLUMNS)), dtype=np.float64, buffer=shm.buf)
+    specs = []
+    offset = 0
+    for (symbol, tf), df in frames.items():
+        n = len(df)
+        block[offset:offset + n, 0] = df.index.asi8 // 1_000_000
+        block[offset:offset + n, 1:] = df[list(COLUMNS[1:])].to_numpy(dtype=float)
+        specs.append((symbol, tf, offset, n))
+        offset += n
+    return shm, total, specs
+
+_attached = {}
+
+def _attach(name, total):
+    # One attachment per block per worker process; older blocks are released
+    if name not in _attached:
+        for old in _attached.values():
+            old[0].close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = (shm, np.ndarray((total, len(COLUMNS)), dtype=np.float64, buffer=shm.buf))
+    return _attached[name][1]
+
+def _init_worker():
+    # Forked workers start with a copy of the parent's unfinished run
+    METRICS.drain()
+
+def _evaluate(task):
+    name, total, symbol, tf, offset, n = task
+    rows = _attach(name, total)[offset:offset + n]
+    df = pd.DataFrame(
+        rows[:, 1:], columns=COLUMNS[1:],
+        index=pd.DatetimeIndex(rows[:, 0].astype("int64") * 1_000_000, name="open_time")
+    )
+    features = evaluate_frame(symbol, tf, df)
+    # Stage timings recorded in the worker travel back with the result
+    return features, METRICS.drain()
+
+class FramePool:
+    def __init__(self, workers):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    def evaluate(self, frames):
+        # frames: {(symbol, tf): DataFrame with ATR} -> {(symbol, tf): evaluate_frame result}
+        frames = {key: df for key, df in frames.items() if df is not None and len(df)}
+        if not frames:
+            return {}
+        shm, total, specs = pack_frames(frames)
+        try:
+            tasks = [(shm.name, total, *spec) for spec in specs]
+            chunksize = max(1, len(tasks) // (self.workers * 4))
+            results = list(self.executor.map(_evaluate, tasks, chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+        for _, run in results:
+            METRICS.merge(run)
+        return {key: features for key, (features, _) in zip(frames, results)}
+
+    def close(self):
+        self.executor.shutdown()
\ No newline at end of file
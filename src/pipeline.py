@@ -0,0 +1,98 @@
+import time
+import numpy as np
+from src.indicators import indicators
+from src.strategies import run_all_strategies
+from src.signal_builder import build_signal, select_multipliers
+from src.confidence import confidence_scores
+from src.momentum import momentum_scores, momentum_category
+from src.validation import valid_mask
+from src.metrics import METRICS
+
+MIN_BARS = 100
+
+def closed_frame(df, interval_ms, now_ms=None):
+    # The frame up to its last fully closed candle: Binance's newest kline is
+    # still forming until its interval has passed, and evaluating it would let
+    # signals flip between runs
+    if df is None or not len(df):
+        return df
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    closes = df.index.asi8 // 1_000_000 + interval_ms
+    return df.iloc[:np.searchsorted(closes, now_ms, side="right")]
+
+def last_open_time(df):
+    return int(df.index.asi8[-1] // 1_000_000)
+
+def evaluate_frame(symbol, tf, df):
+    # The strategies that fired on the last bar of one frame and the shared
+    # scoring inputs (ATR%, RSI, Stoch); None for frames too short to judge.
+    # Depends only on the bars, so it is cached per last closed candle.
+    if df is None or len(df) < MIN_BARS:
+        return None
+    with METRICS.stage("strategy", (symbol, tf)) as stage:
+        fired = run_all_strategies(df)
+        stage["items"] = len(fired)
+    if not fired:
+        return {'fired': []}
+    ind = indicators(df)
+    close = float(df['close'].iloc[-1])
+    return {
+        'fired': fired,
+        'atr_pct': float(df['ATR'].iloc[-1]) / close * 100,
+        'rsi': float(ind.rsi(14).iloc[-1]),
+        'stoch': float(ind.stoch(14).iloc[-1]),
+    }
+
+def build_candidates(symbol, tf, df, features, winrates, tuned=None):
+    # (signal, features) for every strategy that fired; features are the
+    # scoring inputs (is_long, ATR%, RSI, Stoch, winrate). Scoring and slno
+    # happen once candidates from every frame are collected.
+    candidates = []
+    if not features:
+        return candidates
+    for strat in features['fired']:
+        # Historical learning: get ATR multipliers for this strategy
+        winrate = winrates.get(strat['strategy'], 0.5)
+        sl_mult, tp_mult = select_multipliers(strat, symbol, tf, winrate, tuned)
+        signal = build_signal(symbol, tf, df, strat, sl_mult, tp_mult, None)
+        if signal:
+            candidates.append((signal, (strat['side'] == "LONG", features['atr_pct'], features['rsi'], features['stoch'], winrate)))
+    return candidates
+
+def frame_candidates(symbol, tf, df, winrates, tuned=None):
+    return build_candidates(symbol, tf, df, evaluate_frame(symbol, tf, df), winrates, tuned)
+
+def score_candidates(candidates, confidence_threshold):
+    # Confidence and momentum of every candidate of a run in one pass over
+    # the feature table; returns the valid signals with their scores set
+    if not candidates:
+        return []
+    is_long, atr_pct, rsi, stoch, winrate = np.array([f for _, f in candidates], dtype=float).T
+    confidence = confidence_scores(is_long, atr_pct, rsi, winrate)
+    momentum = momentum_scores(rsi, stoch)
+    signals = []
+    for i in np.flatnonzero(valid_mask(confidence, momentum, confidence_threshold)):
+        signal = candidates[i][0]
+        signal['confidence'] = float(confidence[i])
+        signal['momentum'] = int(momentum[i])
+        signal['momentum_cat'] = momentum_category(signal['momentum'])
+        signals.append(signal)
+    return signals
+
+def top_indices(scores, k):
+    # Indices of the k highest scores, highest first, via a partial sort;
+    # equal scores keep input order as a stable sort would
+    scores = np.asarray(scores, dtype=float)
+    if k <= 0:
+        return np.empty(0, dtype=int)
+    if len(scores) > k:
+        kth = scores[np.argpartition(scores, len(scores) - k)[len(scores) - k]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        idx = np.sort(np.r_[above, ties])
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+def select_top(signals, k):
+    return [signals[i] for i in top_indices([s['confidence'] for s in signals], k)]
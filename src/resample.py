@@ -0,0 +1,44 @@
+import numpy as np
+from src.candle_store import CANDLE_DTYPE
+
+# Higher-timeframe candles built from one base interval (e.g. 1m). Buckets
+# are aligned to the UTC epoch like Binance's for every interval up to 1d,
+# so a 15m bar aggregates exactly the 1m bars Binance would put in it. The
+# newest bucket may still be forming, as the newest kline Binance returns.
+
+def resample_rows(rows, step):
+    # rows: base CANDLE_DTYPE rows in open_time order; step: target interval
+    # in ms. A leading bucket the rows only cover partly is dropped.
+    if not len(rows):
+        return np.empty(0, dtype=CANDLE_DTYPE)
+    buckets = rows["open_time"] // step * step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if rows["open_time"][0] != buckets[0]:
+        starts = starts[1:]
+        if not len(starts):
+            return np.empty(0, dtype=CANDLE_DTYPE)
+    ends = np.r_[starts[1:], len(rows)] - 1
+    out = np.empty(len(starts), dtype=CANDLE_DTYPE)
+    out["open_time"] = buckets[starts]
+    out["open"] = rows["open"][starts]
+    out["high"] = np.maximum.reduceat(rows["high"], starts)
+    out["low"] = np.minimum.reduceat(rows["low"], starts)
+    out["close"] = rows["close"][ends]
+    out["volume"] = np.add.reduceat(rows["volume"], starts)
+    return out
+
+def update_resampled(store, symbol, base, tf, step, rebuild=False):
+    # Brings the stored tf series up to date with the stored base series.
+    # Only the buckets from the newest stored one (possibly forming when it
+    # was built) on are re-aggregated; the whole series is rebuilt when the
+    # base bars no longer reach back to it, or on `rebuild`.
+    src = store.load(symbol, base)
+    last = store.last_open_time(symbol, tf)
+    if rebuild or last is None or not len(src) or src.times()[0] > last:
+        return store.merge(symbol, tf, resample_rows(src.rows(), step), replace=True)
+    return store.merge(symbol, tf, resample_rows(src.rows(since=last), step))
+
+def base_bars(limit, steps, base_step):
+    # Base bars needed for `limit` complete bars of the widest timeframe
+    ratio = max(step // base_step for step in steps)
+    return (limit + 1) * ratio
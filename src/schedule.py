@@ -0,0 +1,25 @@
+import time
+
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+
+def interval_seconds(tf):
+    return int(tf[:-1]) * UNIT_SECONDS[tf[-1]]
+
+def last_close(tf, now):
+    # Binance buckets are aligned to the UTC epoch
+    step = interval_seconds(tf)
+    return now // step * step
+
+def next_close(timeframes, now):
+    return min(last_close(tf, now) + interval_seconds(tf) for tf in timeframes)
+
+def closed_since(timeframes, prev, now):
+    return [tf for tf in timeframes if last_close(tf, now) > prev]
+
+def wait_for_close(timeframes, prev, delay=0.0):
+    # Sleeps until the next candle close after `prev` (plus `delay` for the
+    # exchange to publish the final bar) and returns (now, closed timeframes)
+    wake = next_close(timeframes, prev) + delay
+    time.sleep(max(0.0, wake - time.time()))
+    now = time.time()
+    return now, closed_since(timeframes, prev, now)
\ No newline at end of file
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+import time
+import zlib
+
+from src.storage import atomic_write_json
+from src.schedule import last_close
+
+# Sharded scanning: N workers, on one host or several sharing the state
+# directory, each scan a fixed partition of the symbols and spool their
+# scored signals and exit results under the run's directory. Worker 0 then
+# coordinates: it merges the spools, applies dedup and the global top-N once
+# and makes every state write and send. Creating the run's "claimed" file
+# with O_EXCL is the exactly-once gate, even if worker 0 runs twice.
+# Workers never open the state files; they scan with the context (win rates
+# and open trades) the coordinator wrote at the end of the previous run.
+
+SPOOL_TIMEOUT = 60  # seconds the coordinator waits for the other shards
+SPOOL_POLL = 0.2
+SPOOL_KEEP = 50  # run directories kept for inspection
+CONTEXT_FILE = "context.json"
+CLAIM_FILE = "claimed"
+
+def parse_shard(value):
+    # "i/N" -> (i, N)
+    shard, shards = (int(x) for x in value.split("/"))
+    if not 0 <= shard < shards:
+        raise ValueError(f"invalid shard {value!r}, expected i/N with 0 <= i < N")
+    return shard, shards
+
+def shard_of(symbol, shards):
+    # Stable across processes and hosts, unlike hash()
+    return zlib.crc32(symbol.encode()) % shards
+
+def partition(symbols, shard, shards):
+    return [s for s in symbols if shard_of(s, shards) == shard]
+
+def run_id(timeframes, now):
+    # Newest candle close: every worker of the same run agrees on it
+    return max(last_close(tf, int(now)) for tf in timeframes)
+
+def _run_dir(spool, rid):
+    return os.path.join(spool, str(rid))
+
+def _spool_path(spool, rid, shard, shards):
+    return os.path.join(_run_dir(spool, rid), f"shard-{shard}of{shards}.json")
+
+def write_spool(spool, rid, shard, shards, signals, exits):
+    # exits: [(trade, exit_info)]; only the trade's slno travels
+    os.makedirs(_run_dir(spool, rid), exist_ok=True)
+    atomic_write_json(_spool_path(spool, rid, shard, shards), {
+        'shard': shard, 'signals': signals, 'exits': [[t['slno'], info] for t, info in exits]
+    })
+
+def wait_spools(spool, rid, shards, timeout=SPOOL_TIMEOUT):
+    # Payloads of the shards that reported within `timeout`, in shard order,
+    # and the shard numbers that did not
+    deadline = time.time() + timeout
+    while True:
+        missing = [i for i in range(shards) if not os.path.exists(_spool_path(spool, rid, i, shards))]
+        if not missing or time.time() >= deadline:
+            break
+        time.sleep(SPOOL_POLL)
+    payloads = []
+    for i in range(shards):
+        if i in missing:
+            continue
+        with open(_spool_path(spool, rid, i, shards), "r") as f:
+            payloads.append(json.load(f))
+    return payloads, missing
+
+def claim(spool, rid):
+    # True for exactly one caller per run
+    try:
+        fd = os.open(os.path.join(_run_dir(spool, rid), CLAIM_FILE), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    return True
+
+def write_context(spool, winrates, trades):
+    os.makedirs(spool, exist_ok=True)
+    atomic_write_json(os.path.join(spool, CONTEXT_FILE), {'winrates': winrates, 'trades': trades})
+
+def load_context(spool):
+    # Read-only: before the first coordinated run there is no context yet
+    try:
+        with open(os.path.join(spool, CONTEXT_FILE), "r") as f:
+            context = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        context = {}
+    return context.get('winrates', {}), context.get('trades', [])
+
+def prune(spool, keep=SPOOL_KEEP):
+    runs = sorted((int(name) for name in os.listdir(spool) if name.isdigit()), reverse=True)
+    for rid in runs[keep:]:
+        shutil.rmtree(_run_dir(spool, rid), ignore_errors=True)
@@ -1,6 +1,51 @@
+import json
 import time
 import numpy as np
 from src.utils import generate_serial
+from src.exits import check_trade_exits
+
+def adapt_multipliers(atr_mult, winrate):
+    # Adapt multipliers if winrate is high/low
+    if winrate > 0.6:
+        sl_mult = atr_mult['sl'] + 0.2
+        tp_mult = [x + 0.2 for x in atr_mult['tp']]
+    elif winrate < 0.4:
+        sl_mult = max(atr_mult['sl'] - 0.2, 1.0)
+        tp_mult = [max(x - 0.2, 0.8) for x in atr_mult['tp']]
+    else:
+        sl_mult = atr_mult['sl']
+        tp_mult = atr_mult['tp']
+    return sl_mult, tp_mult
+
+def multiplier_key(strategy, side, symbol, tf):
+    # Strategy names are not unique: "RSI Divergence" is both a LONG and a SHORT entry
+    return "|".join((strategy, side, symbol, tf))
+
+def load_tuned(path):
+    # Table published by the optimizer; empty when there is none
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get('multipliers', {})
+    except (OSError, ValueError):
+        return {}
+
+def select_multipliers(strat, symbol, tf, winrate, tuned=None):
+    # Tuned multipliers for this strategy/side/symbol/timeframe when published,
+    # otherwise the win-rate adaptation of the strategy defaults
+    entry = (tuned or {}).get(multiplier_key(strat['strategy'], strat['side'], symbol, tf))
+    if entry is not None:
+        return entry['sl'], entry['tp']
+    return adapt_multipliers(strat['atr_mult'], winrate)
+
+def trade_levels(side, entry, atr, sl_mult, tp_mult):
+    # ATR-based SL/TP per strategy
+    if side == "LONG":
+        sl = entry - atr * sl_mult
+        tp = [entry + atr * m for m in tp_mult]
+    else:
+        sl = entry + atr * sl_mult
+        tp = [entry - atr * m for m in tp_mult]
+    return sl, tp
 
 def build_signal(symbol, tf, df, strat, sl_mult, tp_mult, slno):
     try:
@@ -10,13 +55,7 @@ def build_signal(symbol, tf, df, strat, sl_mult, tp_mult, slno):
         if np.isnan(atr) or atr == 0:
             return None
 
-        # ATR-based SL/TP per strategy
-        if side == "LONG":
-            sl = entry - atr * sl_mult
-            tp = [entry + atr * m for m in tp_mult]
-        else:
-            sl = entry + atr * sl_mult
-            tp = [entry - atr * m for m in tp_mult]
+        sl, tp = trade_levels(side, entry, atr, sl_mult, tp_mult)
 
         return {
             'slno': slno,
@@ -29,42 +68,14 @@ def build_signal(symbol, tf, df, strat, sl_mult, tp_mult, slno):
             'tp': [round(x, 2) for x in tp],
             'tp_multipliers': tp_mult,
             'strategy': strat['strategy'],
+            'atr': atr,
+            'entry_time': int(df.index[-1].value // 1_000_000),
             'opened_at': int(time.time())
         }
     except Exception:
         return None
 
 def check_trade_exit(trade, df):
-    side = trade['side']
-    entry = trade['entry']
-    sl = trade['sl']
-    tp = trade['tp']
-    closes = df['close'].iloc[-10:]
-
-    # Cost-to-cost: only if price first moves in favor by 0.5x ATR, then returns to entry
-    atr = float(df['ATR'].iloc[-1])
-    c2c_trigger = False
-    if side == "LONG":
-        if any(c >= entry + 0.5 * atr for c in closes) and closes.iloc[-1] <= entry:
-            c2c_trigger = True
-    else:
-        if any(c <= entry - 0.5 * atr for c in closes) and closes.iloc[-1] >= entry:
-            c2c_trigger = True
-
-    if c2c_trigger:
-        return {'closed': True, 'reason': 'Cost-to-Cost', 'exit_price': closes.iloc[-1]}
-
-    # SL/TP hit
-    if side == 'LONG':
-        if any(c <= sl for c in closes):
-            return {'closed': True, 'reason': 'SL Hit', 'exit_price': sl}
-        for i, t in enumerate(tp[::-1]):
-            if any(c >= t for c in closes):
-                return {'closed': True, 'reason': f'TP{len(tp)-i} Hit', 'exit_price': t, 'candles_to_win': i+1}
-    else:
-        if any(c >= sl for c in closes):
-            return {'closed': True, 'reason': 'SL Hit', 'exit_price': sl}
-        for i, t in enumerate(tp[::-1]):
-            if any(c <= t for c in closes):
-                return {'closed': True, 'reason': f'TP{len(tp)-i} Hit', 'exit_price': t, 'candles_to_win': i+1}
-    return {'closed': False}
\ No newline at end of file
+    # Single-trade form of check_trade_exits; the interval is read off the index
+    interval_ms = int((df.index[-1] - df.index[-2]).total_seconds() * 1000)
+    return check_trade_exits([trade], df, interval_ms)[0]
\ No newline at end of file
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from urllib.parse import parse_qsl
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from src.data import INTERVAL_MS, MAX_KLINES_LIMIT, klines_weight
+from src.synthetic import synthetic_klines_at
+
+# Local stand-in for the two external APIs the bot talks to: Binance
+# /api/v3/klines (synthetic time-keyed candles, or recorded CandleStore .npy
+# files) and the Telegram Bot API sendMessage (a sink that keeps the
+# messages). Latency, server errors and 429/Retry-After throttling are
+# injected at configurable rates; klines requests report their used weight
+# in X-MBX-USED-WEIGHT-1M and are throttled above an optional weight limit. Point the bot at it with
+# BINANCE_API=http://host:port and TELEGRAM_API=http://host:port.
+
+DEFAULT_LIMIT = 500  # Binance's default for /klines
+KEEP_MESSAGES = 1000  # newest sendMessage payloads kept for inspection
+
+class Faults:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, seed=0, weight_limit=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.weight_limit = weight_limit  # per minute; 0 for none
+
+    def delay(self):
+        return self.latency + self.jitter * self.rng.random()
+
+    def pick(self):
+        # None, "error" or "throttle" for the next request
+        r = self.rng.random()
+        if r < self.throttle_rate:
+            return "throttle"
+        if r < self.throttle_rate + self.error_rate:
+            return "error"
+        return None
+
+def _recorded(records, symbol, interval):
+    path = os.path.join(records, f"{symbol}_{interval}.npy")
+    if not os.path.exists(path):
+        return None
+    rows = np.load(path)
+    step = INTERVAL_MS[interval]
+    return [
+        [int(r["open_time"]), f"{r['open']:.8f}", f"{r['high']:.8f}", f"{r['low']:.8f}", f"{r['close']:.8f}",
+         f"{r['volume']:.8f}", int(r["open_time"]) + step - 1, "0", 0, "0", "0", "0"]
+        for r in rows
+    ]
+
+def select_klines(series, start, end, limit):
+    # Binance semantics over a recorded series: from startTime forward,
+    # otherwise the newest `limit` bars up to endTime
+    if end is not None:
+        series = [k for k in series if k[0] <= end]
+    if start is not None:
+        return [k for k in series if k[0] >= start][:limit]
+    return series[-limit:]
+
+def synthetic_window(symbol, interval, start, end, limit, seed):
+    step = INTERVAL_MS[interval]
+    now = int(time.time() * 1000)
+    last = min(end, now) if end is not None else now
+    last = last // step * step
+    if start is not None:
+        first = -(-start // step) * step
+        times = np.arange(first, min(last, first + (limit - 1) * step) + 1, step)
+    else:
+        times = last - np.arange(limit - 1, -1, -1) * step
+    return synthetic_klines_at(symbol, interval, times, seed)
+
+def create_app(faults=None, records=None, seed=0):
+    faults = faults or Faults()
+    app = FastAPI()
+    app.state.stats = {"klines": 0, "messages": 0, "errors": 0, "throttled": 0, "weight_throttled": 0}
+    weight = {"minute": 0, "used": 0}
+    app.state.messages = deque(maxlen=KEEP_MESSAGES)
+    recorded = {}
+    stats = app.state.stats
+
+    async def inject(telegram=False):
+        # Sleeps the configured latency; returns a fault response or None
+        delay = faults.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        fault = faults.pick()
+        if fault == "throttle":
+            stats["throttled"] += 1
+            if telegram:
+                return JSONResponse({
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {faults.retry_after}",
+                    "parameters": {"retry_after": faults.retry_after}
+                }, status_code=429)
+            return JSONResponse({"code": -1003, "msg": "Too many requests."}, status_code=429,
+                                headers={"Retry-After": str(faults.retry_after)})
+        if fault == "error":
+            stats["errors"] += 1
+            if telegram:
+                return JSONResponse({"ok": False, "error_code": 502, "description": "Bad Gateway"}, status_code=502)
+            return Response("Internal error", status_code=500)
+        return None
+
+    def use_weight(limit):
+        # Binance counts weight per calendar minute, throttled requests included
+        now = time.time()
+        if int(now // 60) != weight["minute"]:
+            weight.update(minute=int(now // 60), used=0)
+        weight["used"] += klines_weight(limit)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(weight["used"])}
+        if faults.weight_limit and weight["used"] > faults.weight_limit:
+            stats["weight_throttled"] += 1
+            headers["Retry-After"] = str(60 - int(now % 60))
+            return JSONResponse({"code": -1003, "msg": "Too much request weight used."}, status_code=429, headers=headers)
+        return headers
+
+    @app.get("/api/v3/klines")
+    async def klines(symbol: str, interval: str, limit: int = DEFAULT_LIMIT, startTime: int = None, endTime: int = None):
+        fault = await inject()
+        if fault is not None:
+            return fault
+        headers = use_weight(limit)
+        if isinstance(headers, Response):
+            return headers
+        stats["klines"] += 1
+        if interval not in INTERVAL_MS:
+            return JSONResponse({"code": -1120, "msg": "Invalid interval."}, status_code=400, headers=headers)
+        limit = max(1, min(limit, MAX_KLINES_LIMIT))
+        if records:
+            key = (symbol, interval)
+            if key not in recorded:
+                recorded[key] = _recorded(records, symbol, interval)
+            if recorded[key] is not None:
+                return JSONResponse(select_klines(recorded[key], startTime, endTime, limit), headers=headers)
+        return JSONResponse(synthetic_window(symbol, interval, startTime, endTime, limit, seed), headers=headers)
+
+    @app.post("/bot{token}/sendMessage")
+    async def send_message(token: str, request: Request):
+        fault = await inject(telegram=True)
+        if fault is not None:
+            return fault
+        if request.headers.get("content-type", "").startswith("application/json"):
+            params = await request.json()
+        else:
+            params = dict(parse_qsl((await request.body()).decode()))
+        stats["messages"] += 1
+        app.state.messages.append(params)
+        chat_id = str(params.get("chat_id", "0"))
+        return {"ok": True, "result": {
+            "message_id": stats["messages"], "date": int(time.time()), "text": params.get("text", ""),
+            "chat": {"id": int(chat_id) if chat_id.lstrip("-").isdigit() else 0, "type": "private"}
+        }}
+
+    @app.get("/_stats")
+    async def get_stats():
+        return stats
+
+    return app
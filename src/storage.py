@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+INDEXED_FIELDS = ("slno", "strategy", "symbol")
+COMPACT_BYTES = 64 * 1024  # JSON table journals below this size are never compacted
+
+def atomic_write_json(path, data):
+    # Readers only ever see the old or the new file, never a partial write
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def safe_load_json(path, default):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        atomic_write_json(path, default)
+        return default
+    with open(path, "r") as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            pass
+    # Keep the unreadable file for inspection instead of silently dropping it
+    os.replace(path, f"{path}.corrupt")
+    print(f"State file {path} was unreadable, moved to {path}.corrupt")
+    atomic_write_json(path, default)
+    return default
+
+def open_table(path, name, key=None, migrate=None):
+    # `key` names the record field used for upserts/deletes; without one the
+    # table is append-only and records get an integer "id"
+    if path.endswith(SQLITE_SUFFIXES):
+        return SQLiteTable(path, name, key)
+    return JSONTable(path, key, migrate)
+
+def open_log(path, name):
+    # Append-only records: a JSON-lines file, or a keyless table when the
+    # path is a SQLite database
+    if path.endswith(SQLITE_SUFFIXES):
+        return SQLiteTable(path, name)
+    return JSONLinesLog(path)
+
+class JSONLinesLog:
+    # One JSON record per line, so an append never rewrites earlier records;
+    # a record's id is its line number
+    def __init__(self, path):
+        self.path = path
+
+    def all(self):
+        records = []
+        try:
+            with open(self.path, "r") as f:
+                for i, line in enumerate(f, 1):
+                    try:
+                        records.append(dict(json.loads(line), id=i))
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted append
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def put(self, *records):
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def journal_path(path):
+    return f"{path}.journal"
+
+def _rows(data, key):
+    # Records by key; keyless records get integer ids in list order
+    rows = {}
+    next_id = 1
+    for record in data:
+        if key is None:
+            record.setdefault("id", next_id)
+            next_id = max(next_id, record["id"] + 1)
+            rows[record["id"]] = record
+        else:
+            rows[record[key]] = record
+    return rows
+
+def _replay(rows, path, key):
+    # Applies a JSON table's journal to `rows` (keyed as JSONTable keys them);
+    # returns the length of its complete lines in bytes
+    key = key or "id"
+    size = 0
+    try:
+        with open(journal_path(path), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A torn last line from an interrupted append
+                    break
+                size += len(line)
+                try:
+                    op = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                for record in op.get("put", ()):
+                    rows[record[key]] = record
+                for k in op.get("delete", ()):
+                    rows.pop(k, None)
+    except FileNotFoundError:
+        pass
+    return size
+
+class JSONTable:
+    # The collection as one JSON list plus a journal of the puts and deletes
+    # made since, one JSON line per call. A change only appends to the
+    # journal; once the journal outgrows the list (and COMPACT_BYTES), the
+    # list is rewritten and the journal dropped, so rewrites cost O(1) per
+    # change amortized. Replaying a journal is idempotent, so a crash
+    # between the two steps of a compaction loses nothing.
+    def __init__(self, path, key=None, migrate=None):
+        self.path = path
+        self.key = key
+        data = safe_load_json(path, [])
+        if migrate is not None:
+            data = migrate(data)
+        self.rows = _rows(data, key)
+        self.snapshot_bytes = os.path.getsize(path)
+        self.journal_bytes = _replay(self.rows, path, key)
+        if os.path.exists(journal_path(path)) and os.path.getsize(journal_path(path)) > self.journal_bytes:
+            # Later appends would otherwise continue the torn line
+            with open(journal_path(path), "ab") as f:
+                f.truncate(self.journal_bytes)
+        self._next_id = max(self.rows, default=0) + 1 if key is None else None
+        self._maybe_compact()
+
+    def _index(self, record):
+        if self.key is None:
+            record.setdefault("id", self._next_id)
+            self._next_id = max(self._next_id, record["id"] + 1)
+            self.rows[record["id"]] = record
+        else:
+            self.rows[record[self.key]] = record
+
+    def all(self):
+        return list(self.rows.values())
+
+    def find(self, **where):
+        return [r for r in self.rows.values() if all(r.get(k) == v for k, v in where.items())]
+
+    def put(self, *records):
+        for record in records:
+            self._index(record)
+        if records:
+            self._append({"put": list(records)})
+
+    def delete(self, *keys):
+        removed = [k for k in keys if self.rows.pop(k, None) is not None]
+        if removed:
+            self._append({"delete": removed})
+
+    def _append(self, op):
+        line = json.dumps(op) + "\n"
+        with open(journal_path(self.path), "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_bytes += len(line.encode())
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.journal_bytes > max(self.snapshot_bytes, COMPACT_BYTES):
+            self.compact()
+
+    def compact(self):
+        atomic_write_json(self.path, list(self.rows.values()))
+        self.snapshot_bytes = os.path.getsize(self.path)
+        try:
+            os.remove(journal_path(self.path))
+        except FileNotFoundError:
+            pass
+        self.journal_bytes = 0
+
+_connections = {}
+_watchers = {}
+_lock = threading.Lock()
+
+@contextmanager
+def _transaction(conn):
+    # The connection is shared by the whole process: a failed write must not
+    # leave it inside an open transaction
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def _connect(path):
+    # One autocommit WAL connection per database file per process
+    with _lock:
+        if path not in _connections:
+            conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _connections[path] = conn
+        return _connections[path]
+
+def data_version(path):
+    # Changes whenever a writer commits: SQLite's data_version for databases,
+    # the stat of the JSON list and its journal otherwise (compactions
+    # replace the list, so its inode changes; changes grow the journal)
+    if path.endswith(SQLITE_SUFFIXES):
+        # data_version ignores the connection's own commits, so watch on a
+        # separate one to also see writes made through _connect in this process
+        with _lock:
+            if path not in _watchers:
+                _watchers[path] = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            return _watchers[path].execute("PRAGMA data_version").fetchone()[0]
+    stats = []
+    for p in (path, journal_path(path)):
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            stats.append(None)
+            continue
+        stats.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    return None if stats == [None, None] else tuple(stats)
+
+def read_table(path, name, key=None):
+    # Read-only snapshot for other processes; None if the file is unreadable
+    if path.endswith(SQLITE_SUFFIXES):
+        return SQLiteTable(path, name, key).all()
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    # The list first: a compaction in between leaves the snapshot stale but
+    # consistent, and changes data_version so the reader reloads
+    rows = _rows(data, key)
+    _replay(rows, path, key)
+    return list(rows.values())
+
+class SQLiteTable:
+    # One row per record; each put/delete call is one transaction
+    def __init__(self, path, name, key=None):
+        self.conn = _connect(path)
+        self.name = name
+        self.key = key
+        cols = ", ".join(f"{f} TEXT" for f in INDEXED_FIELDS)
+        with _lock:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} "
+                f"(id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE, {cols}, data TEXT NOT NULL)"
+            )
+            for field in INDEXED_FIELDS:
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_{field} ON {name}({field})")
+
+    def _records(self, rows):
+        records = []
+        for row_id, data in rows:
+            record = json.loads(data)
+            if self.key is None:
+                record["id"] = row_id
+            records.append(record)
+        return records
+
+    def all(self):
+        with _lock:
+            rows = self.conn.execute(f"SELECT id, data FROM {self.name} ORDER BY id").fetchall()
+        return self._records(rows)
+
+    def find(self, **where):
+        indexed = {k: v for k, v in where.items() if k in INDEXED_FIELDS}
+        clause = " AND ".join(f"{k} = ?" for k in indexed) or "1"
+        with _lock:
+            rows = self.conn.execute(
+                f"SELECT id, data FROM {self.name} WHERE {clause} ORDER BY id", tuple(indexed.values())
+            ).fetchall()
+        records = self._records(rows)
+        return [r for r in records if all(r.get(k) == v for k, v in where.items())]
+
+    def put(self, *records):
+        cols = ", ".join(INDEXED_FIELDS)
+        marks = ", ".join("?" for _ in INDEXED_FIELDS)
+        updates = ", ".join(f"{f} = excluded.{f}" for f in (*INDEXED_FIELDS, "data"))
+        with _lock, _transaction(self.conn):
+            for record in records:
+                data = json.dumps({k: v for k, v in record.items() if not (self.key is None and k == "id")})
+                values = [None if record.get(f) is None else str(record.get(f)) for f in INDEXED_FIELDS]
+                if self.key is None:
+                    cur = self.conn.execute(f"INSERT INTO {self.name} ({cols}, data) VALUES ({marks}, ?)", (*values, data))
+                    record["id"] = cur.lastrowid
+                else:
+                    self.conn.execute(
+                        f"INSERT INTO {self.name} (key, {cols}, data) VALUES (?, {marks}, ?) "
+                        f"ON CONFLICT(key) DO UPDATE SET {updates}",
+                        (str(record[self.key]), *values, data)
+                    )
+
+    def delete(self, *keys):
+        column = "id" if self.key is None else "key"
+        params = [(key if self.key is None else str(key),) for key in keys]
+        with _lock, _transaction(self.conn):
+            self.conn.executemany(f"DELETE FROM {self.name} WHERE {column} = ?", params)
@@ -1,148 +1,170 @@
 import numpy as np
-import pandas as pd
-from ta.trend import EMAIndicator, MACD
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.volatility import BollingerBands
-from src.utils import find_support_resistance, vwap, find_order_block_break
+from src.indicators import indicators
+
+# VWAP spans the closed bars of a live frame (the runner's 200-bar fetch
+# minus the forming bar), so a backtest over a long frame sees the same values
+VWAP_WINDOW = 199
+
+# Array helpers: every signal is a boolean array over the whole frame
+def _col(df, name):
+    return df[name].to_numpy(dtype=float)
+
+def _prev(a):
+    out = np.empty_like(a)
+    out[:1] = np.nan
+    out[1:] = a[:-1]
+    return out
+
+def _ind(df, name, *args):
+    return getattr(indicators(df), name)(*args).to_numpy(dtype=float)
 
 # Strict, auditable, proven strategies only
 STRATEGY_LIST = [
     {
         "name": "RSI Divergence",
-        "condition": lambda df: (
-            RSIIndicator(df['close'], window=14).rsi().iloc[-1] < 30 and
-            df['close'].iloc[-1] > df['open'].iloc[-1]
+        "signal": lambda df: (
+            (_ind(df, 'rsi', 14) < 30) &
+            (_col(df, 'close') > _col(df, 'open'))
         ),
         "side": "LONG",
         "atr_mult": {"sl": 1.2, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "RSI Divergence",
-        "condition": lambda df: (
-            RSIIndicator(df['close'], window=14).rsi().iloc[-1] > 70 and
-            df['close'].iloc[-1] < df['open'].iloc[-1]
+        "signal": lambda df: (
+            (_ind(df, 'rsi', 14) > 70) &
+            (_col(df, 'close') < _col(df, 'open'))
         ),
         "side": "SHORT",
         "atr_mult": {"sl": 1.2, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "VWAP Breakout",
-        "condition": lambda df: (
-            df['close'].iloc[-1] > vwap(df) and
-            df['close'].iloc[-2] < vwap(df) and
-            df['volume'].iloc[-1] > df['volume'].rolling(20).mean().iloc[-1]
+        "signal": lambda df: (
+            (_col(df, 'close') > _ind(df, 'vwap_series', VWAP_WINDOW)) &
+            (_prev(_col(df, 'close')) < _ind(df, 'vwap_series', VWAP_WINDOW)) &
+            (_col(df, 'volume') > _ind(df, 'rolling_mean', 'volume', 20))
         ),
         "side": "LONG",
         "atr_mult": {"sl": 1.3, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "VWAP Breakdown",
-        "condition": lambda df: (
-            df['close'].iloc[-1] < vwap(df) and
-            df['close'].iloc[-2] > vwap(df) and
-            df['volume'].iloc[-1] > df['volume'].rolling(20).mean().iloc[-1]
+        "signal": lambda df: (
+            (_col(df, 'close') < _ind(df, 'vwap_series', VWAP_WINDOW)) &
+            (_prev(_col(df, 'close')) > _ind(df, 'vwap_series', VWAP_WINDOW)) &
+            (_col(df, 'volume') > _ind(df, 'rolling_mean', 'volume', 20))
         ),
         "side": "SHORT",
         "atr_mult": {"sl": 1.3, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "EMA Bullish Cross",
-        "condition": lambda df: (
-            EMAIndicator(df['close'], window=9).ema_indicator().iloc[-1] > EMAIndicator(df['close'], window=21).ema_indicator().iloc[-1] and
-            EMAIndicator(df['close'], window=9).ema_indicator().iloc[-2] < EMAIndicator(df['close'], window=21).ema_indicator().iloc[-2]
+        "signal": lambda df: (
+            (_ind(df, 'ema', 9) > _ind(df, 'ema', 21)) &
+            (_prev(_ind(df, 'ema', 9)) < _prev(_ind(df, 'ema', 21)))
         ),
         "side": "LONG",
         "atr_mult": {"sl": 1.2, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "EMA Bearish Cross",
-        "condition": lambda df: (
-            EMAIndicator(df['close'], window=9).ema_indicator().iloc[-1] < EMAIndicator(df['close'], window=21).ema_indicator().iloc[-1] and
-            EMAIndicator(df['close'], window=9).ema_indicator().iloc[-2] > EMAIndicator(df['close'], window=21).ema_indicator().iloc[-2]
+        "signal": lambda df: (
+            (_ind(df, 'ema', 9) < _ind(df, 'ema', 21)) &
+            (_prev(_ind(df, 'ema', 9)) > _prev(_ind(df, 'ema', 21)))
         ),
         "side": "SHORT",
         "atr_mult": {"sl": 1.2, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "Bollinger Squeeze Breakout",
-        "condition": lambda df: (
-            (BollingerBands(df['close'], window=20, window_dev=2).bollinger_hband() - BollingerBands(df['close'], window=20, window_dev=2).bollinger_lband()).iloc[-1] <
-            (BollingerBands(df['close'], window=20, window_dev=2).bollinger_hband() - BollingerBands(df['close'], window=20, window_dev=2).bollinger_lband()).rolling(20).mean().iloc[-1] * 0.7 and
-            df['close'].iloc[-1] > BollingerBands(df['close'], window=20, window_dev=2).bollinger_hband().iloc[-1]
+        "signal": lambda df: (
+            (_ind(df, 'bb_width', 20, 2) < _ind(df, 'bb_width_mean', 20, 2, 20) * 0.7) &
+            (_col(df, 'close') > _ind(df, 'bb_hband', 20, 2))
         ),
         "side": "LONG",
         "atr_mult": {"sl": 1.5, "tp": [1.5, 2.5, 3.0]}
     },
     {
         "name": "Bollinger Squeeze Breakdown",
-        "condition": lambda df: (
-            (BollingerBands(df['close'], window=20, window_dev=2).bollinger_hband() - BollingerBands(df['close'], window=20, window_dev=2).bollinger_lband()).iloc[-1] <
-            (BollingerBands(df['close'], window=20, window_dev=2).bollinger_hband() - BollingerBands(df['close'], window=20, window_dev=2).bollinger_lband()).rolling(20).mean().iloc[-1] * 0.7 and
-            df['close'].iloc[-1] < BollingerBands(df['close'], window=20, window_dev=2).bollinger_lband().iloc[-1]
+        "signal": lambda df: (
+            (_ind(df, 'bb_width', 20, 2) < _ind(df, 'bb_width_mean', 20, 2, 20) * 0.7) &
+            (_col(df, 'close') < _ind(df, 'bb_lband', 20, 2))
         ),
         "side": "SHORT",
         "atr_mult": {"sl": 1.5, "tp": [1.5, 2.5, 3.0]}
     },
     {
         "name": "MACD Bullish Cross",
-        "condition": lambda df: (
-            MACD(df['close']).macd_diff().iloc[-1] > 0 and
-            MACD(df['close']).macd_diff().iloc[-2] < 0
+        "signal": lambda df: (
+            (_ind(df, 'macd_diff') > 0) &
+            (_prev(_ind(df, 'macd_diff')) < 0)
         ),
         "side": "LONG",
         "atr_mult": {"sl": 1.3, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "MACD Bearish Cross",
-        "condition": lambda df: (
-            MACD(df['close']).macd_diff().iloc[-1] < 0 and
-            MACD(df['close']).macd_diff().iloc[-2] > 0
+        "signal": lambda df: (
+            (_ind(df, 'macd_diff') < 0) &
+            (_prev(_ind(df, 'macd_diff')) > 0)
         ),
         "side": "SHORT",
         "atr_mult": {"sl": 1.3, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "Stochastic Bullish Cross",
-        "condition": lambda df: (
-            StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch_signal().iloc[-1] > StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch().iloc[-1] and
-            StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch_signal().iloc[-2] < StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch().iloc[-2]
+        "signal": lambda df: (
+            (_ind(df, 'stoch_signal', 14) > _ind(df, 'stoch', 14)) &
+            (_prev(_ind(df, 'stoch_signal', 14)) < _prev(_ind(df, 'stoch', 14)))
         ),
         "side": "LONG",
         "atr_mult": {"sl": 1.2, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "Stochastic Bearish Cross",
-        "condition": lambda df: (
-            StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch_signal().iloc[-1] < StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch().iloc[-1] and
-            StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch_signal().iloc[-2] > StochasticOscillator(df['high'], df['low'], df['close'], window=14).stoch().iloc[-2]
+        "signal": lambda df: (
+            (_ind(df, 'stoch_signal', 14) < _ind(df, 'stoch', 14)) &
+            (_prev(_ind(df, 'stoch_signal', 14)) > _prev(_ind(df, 'stoch', 14)))
         ),
         "side": "SHORT",
         "atr_mult": {"sl": 1.2, "tp": [1.0, 1.5, 2.0]}
     },
     {
         "name": "Order Block Break (High)",
-        "condition": lambda df: find_order_block_break(df, "LONG"),
+        "signal": lambda df: _col(df, 'close') > _prev(_ind(df, 'rolling_max', 'high', 10)),
         "side": "LONG",
         "atr_mult": {"sl": 1.4, "tp": [1.2, 1.8, 2.5]}
     },
     {
         "name": "Order Block Break (Low)",
-        "condition": lambda df: find_order_block_break(df, "SHORT"),
+        "signal": lambda df: _col(df, 'close') < _prev(_ind(df, 'rolling_min', 'low', 10)),
         "side": "SHORT",
         "atr_mult": {"sl": 1.4, "tp": [1.2, 1.8, 2.5]}
     },
 ]
 
-def run_all_strategies(df):
-    results = []
-    for strat in STRATEGY_LIST:
+def signal_matrix(df):
+    # Bars x strategies, column order follows STRATEGY_LIST
+    matrix = np.zeros((len(df), len(STRATEGY_LIST)), dtype=bool)
+    for j, strat in enumerate(STRATEGY_LIST):
         try:
-            if strat["condition"](df):
-                results.append({
-                    "strategy": strat["name"],
-                    "side": strat["side"],
-                    "atr_mult": strat["atr_mult"]
-                })
+            matrix[:, j] = strat["signal"](df)
         except Exception:
             continue
+    return matrix
+
+def run_all_strategies(df):
+    # Strategies that fired on the last bar; signal_matrix() has every bar
+    matrix = signal_matrix(df)
+    results = []
+    if not len(matrix):
+        return results
+    for strat, fired in zip(STRATEGY_LIST, matrix[-1]):
+        if fired:
+            results.append({
+                "strategy": strat["name"],
+                "side": strat["side"],
+                "atr_mult": strat["atr_mult"]
+            })
     return results
\ No newline at end of file
@@ -0,0 +1,478 @@
+import math
+from collections import deque
+import numpy as np
+
+from src.cache import frame_key
+from src.metrics import METRICS
+from src.pipeline import MIN_BARS, evaluate_frame
+from src.storage import open_table
+from src.strategies import STRATEGY_LIST, VWAP_WINDOW
+
+# Constant-time-per-candle counterparts of the `ta` indicators used by the
+# strategies. Warm-up behaviour matches `ta` (NaN, or 0.0 for ATR) so values
+# line up with src.indicators once enough candles have been fed. Every class
+# round-trips through to_dict()/from_dict() so a restarted process resumes
+# without replaying history.
+
+NAN = float("nan")
+
+class StreamingIndicator:
+    fields = ()
+
+    def to_dict(self):
+        state = {"type": type(self).__name__}
+        for name in self.fields:
+            value = getattr(self, name)
+            if isinstance(value, deque):
+                value = {"deque": list(value), "maxlen": value.maxlen}
+            elif isinstance(value, StreamingIndicator):
+                value = value.to_dict()
+            state[name] = value
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls.__new__(cls)
+        for name in cls.fields:
+            value = state[name]
+            if isinstance(value, dict) and "deque" in value:
+                value = deque(value["deque"], maxlen=value["maxlen"])
+            elif isinstance(value, dict) and "type" in value:
+                value = _TYPES[value["type"]].from_dict(value)
+            setattr(obj, name, value)
+        return obj
+
+class EMA(StreamingIndicator):
+    # pandas ewm(span=window, adjust=False, min_periods=window)
+    fields = ("window", "alpha", "value", "count")
+
+    def __init__(self, window=14, alpha=None):
+        self.window = window
+        self.alpha = alpha if alpha is not None else 2 / (window + 1)
+        self.value = None
+        self.count = 0
+
+    def update(self, x):
+        if x is None or math.isnan(x):
+            return self.current()
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.current()
+
+    def current(self):
+        return self.value if self.count >= self.window else NAN
+
+class RSI(StreamingIndicator):
+    # Wilder smoothing (alpha = 1/window) of up/down moves, as ta.RSIIndicator
+    fields = ("window", "prev", "up", "down")
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev = None
+        self.up = EMA(window, alpha=1 / window)
+        self.down = EMA(window, alpha=1 / window)
+
+    def update(self, close):
+        diff = 0.0 if self.prev is None else close - self.prev
+        self.prev = close
+        self.up.update(diff if diff > 0 else 0.0)
+        self.down.update(-diff if diff < 0 else 0.0)
+        return self.current()
+
+    def current(self):
+        up, down = self.up.current(), self.down.current()
+        if down == 0:
+            return 100.0
+        if math.isnan(up) or math.isnan(down):
+            return NAN
+        return 100 - 100 / (1 + up / down)
+
+class ATR(StreamingIndicator):
+    # ta.AverageTrueRange: 0.0 while warming up, SMA seed, then Wilder smoothing
+    fields = ("window", "prev_close", "count", "seed", "value")
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = None
+        self.count = 0
+        self.seed = 0.0
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.count < self.window:
+            self.seed += tr
+        elif self.count == self.window:
+            self.value = (self.seed + tr) / self.window
+        else:
+            self.value = (self.value * (self.window - 1) + tr) / self.window
+        return self.current()
+
+    def current(self):
+        return self.value if self.count >= self.window else 0.0
+
+class MACD(StreamingIndicator):
+    # ta.MACD histogram (macd_diff); the signal EMA starts at the first valid MACD
+    fields = ("fast", "slow", "signal", "macd")
+
+    def __init__(self, window_slow=26, window_fast=12, window_sign=9):
+        self.fast = EMA(window_fast)
+        self.slow = EMA(window_slow)
+        self.signal = EMA(window_sign)
+        self.macd = NAN
+
+    def update(self, close):
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        self.signal.update(self.macd)
+        return self.current()
+
+    def current(self):
+        return self.macd - self.signal.current()
+
+class RollingExtreme(StreamingIndicator):
+    # Monotonic deque of (index, value): amortised O(1) rolling max or min
+    fields = ("window", "mode", "index", "items")
+
+    def __init__(self, window=10, mode="max"):
+        self.window = window
+        self.mode = mode
+        self.index = 0
+        self.items = deque()
+
+    def update(self, x):
+        better = (lambda a, b: a >= b) if self.mode == "max" else (lambda a, b: a <= b)
+        while self.items and better(x, self.items[-1][1]):
+            self.items.pop()
+        self.items.append([self.index, x])
+        while self.items[0][0] <= self.index - self.window:
+            self.items.popleft()
+        self.index += 1
+        return self.current()
+
+    def current(self):
+        return self.items[0][1] if self.index >= self.window else NAN
+
+class RollingMean(StreamingIndicator):
+    fields = ("window", "values", "total")
+
+    def __init__(self, window=20):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.current()
+
+    def current(self):
+        return self.total / self.window if len(self.values) == self.window else NAN
+
+class Bollinger(StreamingIndicator):
+    # Sliding-window Welford mean/variance, population std as ta.BollingerBands
+    fields = ("window", "dev", "values", "mean", "m2")
+
+    def __init__(self, window=20, dev=2):
+        self.window = window
+        self.dev = dev
+        self.values = deque(maxlen=window)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x):
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (x - self.mean)
+        else:
+            old = self.values[0]
+            self.values.append(x)
+            prev_mean = self.mean
+            self.mean += (x - old) / self.window
+            self.m2 = max(self.m2 + (x - old) * (x - self.mean + old - prev_mean), 0.0)
+        return self.current()
+
+    def std(self):
+        return math.sqrt(self.m2 / self.window) if len(self.values) == self.window else NAN
+
+    def current(self):
+        std = self.std()
+        mavg = self.mean if len(self.values) == self.window else NAN
+        return mavg + self.dev * std, mavg - self.dev * std
+
+class Stochastic(StreamingIndicator):
+    # ta.StochasticOscillator %K and its `smooth`-bar SMA (%D)
+    fields = ("window", "smooth", "highs", "lows", "k", "recent_k")
+
+    def __init__(self, window=14, smooth=3):
+        self.window = window
+        self.smooth = smooth
+        self.highs = RollingExtreme(window, "max")
+        self.lows = RollingExtreme(window, "min")
+        self.k = NAN
+        self.recent_k = deque(maxlen=smooth)
+
+    def update(self, high, low, close):
+        hh = self.highs.update(high)
+        ll = self.lows.update(low)
+        if math.isnan(hh) or math.isnan(ll) or hh == ll:
+            self.k = NAN
+        else:
+            self.k = 100 * (close - ll) / (hh - ll)
+        self.recent_k.append(self.k)
+        return self.current()
+
+    def current(self):
+        ks = self.recent_k
+        if len(ks) < self.smooth or any(math.isnan(k) for k in ks):
+            return self.k, NAN
+        return self.k, sum(ks) / self.smooth
+
+class VWAP(StreamingIndicator):
+    # window=None gives the cumulative VWAP; window=N matches vwap_series(N)
+    fields = ("window", "bars", "pv", "vol", "last_close")
+
+    def __init__(self, window=None):
+        self.window = window
+        self.bars = deque(maxlen=window)
+        self.pv = 0.0
+        self.vol = 0.0
+        self.last_close = NAN
+
+    def update(self, close, volume):
+        if self.window is not None and len(self.bars) == self.window:
+            old_close, old_volume = self.bars[0]
+            self.pv -= old_close * old_volume
+            self.vol -= old_volume
+        if self.window is not None:
+            self.bars.append([close, volume])
+        self.pv += close * volume
+        self.vol += volume
+        self.last_close = close
+        return self.current()
+
+    def current(self):
+        return self.pv / self.vol if self.vol != 0 else self.last_close
+
+_TYPES = {cls.__name__: cls for cls in (EMA, RSI, ATR, MACD, RollingExtreme, RollingMean, Bollinger, Stochastic, VWAP)}
+
+class IndicatorEngine:
+    # The full indicator set of one (symbol, timeframe), fed one closed candle
+    # at a time. The previous candle's snapshot is kept too, since the cross
+    # and breakout strategies compare the last bar with the one before it.
+    def __init__(self, frame_size=199):
+        self.last_open_time = None
+        self.prev = None
+        self.bar = None
+        self.indicators = {
+            "atr": ATR(14),
+            "rsi": RSI(14),
+            "ema9": EMA(9),
+            "ema21": EMA(21),
+            "macd_diff": MACD(),
+            "stoch": Stochastic(14, 3),
+            "bb": Bollinger(20, 2),
+            "bb_width_mean": RollingMean(20),
+            "volume_mean": RollingMean(20),
+            "high_max": RollingExtreme(10, "max"),
+            "low_min": RollingExtreme(10, "min"),
+            "vwap": VWAP(frame_size),
+        }
+
+    def update(self, open_time, open_, high, low, close, volume):
+        # Candles at or before the last applied open_time are ignored, so
+        # replaying an overlapping fetch after a restart is harmless
+        if self.last_open_time is not None and open_time <= self.last_open_time:
+            return self.snapshot()
+        self.prev = self.snapshot() if self.bar is not None else None
+        ind = self.indicators
+        ind["atr"].update(high, low, close)
+        ind["rsi"].update(close)
+        ind["ema9"].update(close)
+        ind["ema21"].update(close)
+        ind["macd_diff"].update(close)
+        ind["stoch"].update(high, low, close)
+        bb_hband, bb_lband = ind["bb"].update(close)
+        # rolling(20).mean() of the band width: NaN until 20 widths exist
+        if not math.isnan(bb_hband):
+            ind["bb_width_mean"].update(bb_hband - bb_lband)
+        ind["volume_mean"].update(volume)
+        ind["high_max"].update(high)
+        ind["low_min"].update(low)
+        ind["vwap"].update(close, volume)
+        self.bar = {"open": open_, "close": close, "volume": volume}
+        self.last_open_time = open_time
+        return self.snapshot()
+
+    def update_frame(self, df):
+        for open_time, row in zip(df.index.asi8 // 1_000_000, df[["open", "high", "low", "close", "volume"]].to_numpy()):
+            self.update(int(open_time), *map(float, row))
+        return self.snapshot()
+
+    def snapshot(self):
+        ind = self.indicators
+        stoch, stoch_signal = ind["stoch"].current()
+        bb_hband, bb_lband = ind["bb"].current()
+        return dict(
+            self.bar or {"open": NAN, "close": NAN, "volume": NAN},
+            atr=ind["atr"].current(),
+            rsi=ind["rsi"].current(),
+            ema9=ind["ema9"].current(),
+            ema21=ind["ema21"].current(),
+            macd_diff=ind["macd_diff"].current(),
+            stoch=stoch,
+            stoch_signal=stoch_signal,
+            bb_hband=bb_hband,
+            bb_lband=bb_lband,
+            bb_width=bb_hband - bb_lband,
+            bb_width_mean=ind["bb_width_mean"].current(),
+            volume_mean=ind["volume_mean"].current(),
+            high_max=ind["high_max"].current(),
+            low_min=ind["low_min"].current(),
+            vwap=ind["vwap"].current(),
+        )
+
+    def to_dict(self):
+        return {
+            "last_open_time": self.last_open_time,
+            "prev": self.prev,
+            "bar": self.bar,
+            "indicators": {name: ind.to_dict() for name, ind in self.indicators.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        engine = cls.__new__(cls)
+        engine.last_open_time = state["last_open_time"]
+        engine.prev = state["prev"]
+        engine.bar = state["bar"]
+        engine.indicators = {
+            name: _TYPES[s["type"]].from_dict(s) for name, s in state["indicators"].items()
+        }
+        return engine
+
+# Last-bar form of every entry of STRATEGY_LIST, same order: (current, previous) snapshots -> fired.
+# Comparisons with NaN are False, as in the array form.
+CONDITIONS = [
+    lambda c, p: c["rsi"] < 30 and c["close"] > c["open"],
+    lambda c, p: c["rsi"] > 70 and c["close"] < c["open"],
+    lambda c, p: c["close"] > c["vwap"] and p["close"] < c["vwap"] and c["volume"] > c["volume_mean"],
+    lambda c, p: c["close"] < c["vwap"] and p["close"] > c["vwap"] and c["volume"] > c["volume_mean"],
+    lambda c, p: c["ema9"] > c["ema21"] and p["ema9"] < p["ema21"],
+    lambda c, p: c["ema9"] < c["ema21"] and p["ema9"] > p["ema21"],
+    lambda c, p: c["bb_width"] < c["bb_width_mean"] * 0.7 and c["close"] > c["bb_hband"],
+    lambda c, p: c["bb_width"] < c["bb_width_mean"] * 0.7 and c["close"] < c["bb_lband"],
+    lambda c, p: c["macd_diff"] > 0 and p["macd_diff"] < 0,
+    lambda c, p: c["macd_diff"] < 0 and p["macd_diff"] > 0,
+    lambda c, p: c["stoch_signal"] > c["stoch"] and p["stoch_signal"] < p["stoch"],
+    lambda c, p: c["stoch_signal"] < c["stoch"] and p["stoch_signal"] > p["stoch"],
+    lambda c, p: c["close"] > p["high_max"],
+    lambda c, p: c["close"] < p["low_min"],
+]
+
+PARITY_EVERY = 50  # streamed candles per frame between checks against `ta` on the live window
+# An engine seeded before the live window's first bar differs from `ta` on
+# that window by a few 1e-6 (EMA/Wilder seeds decay as (1 - alpha)^199)
+PARITY_RTOL = 1e-4
+
+def engine_features(engine):
+    # evaluate_frame() computed from the engine's last two snapshots
+    cur = engine.snapshot()
+    prev = engine.prev or {name: NAN for name in cur}
+    fired = [
+        {"strategy": strat["name"], "side": strat["side"], "atr_mult": strat["atr_mult"]}
+        for strat, condition in zip(STRATEGY_LIST, CONDITIONS) if condition(cur, prev)
+    ]
+    if not fired:
+        return {'fired': []}
+    return {
+        'fired': fired,
+        'atr_pct': cur["atr"] / cur["close"] * 100,
+        'rsi': cur["rsi"],
+        'stoch': cur["stoch"],
+    }
+
+def _close_enough(a, b):
+    if a is None or b is None:
+        return a is b
+    return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=PARITY_RTOL, abs_tol=1e-9)
+
+def same_features(a, b):
+    if a is None or b is None:
+        return a is b
+    if [(s['strategy'], s['side']) for s in a['fired']] != [(s['strategy'], s['side']) for s in b['fired']]:
+        return False
+    return all(_close_enough(a.get(k), b.get(k)) for k in ('atr_pct', 'rsi', 'stoch'))
+
+class StreamingFrames:
+    # Daemon-side replacement for evaluate_frame(): one warm IndicatorEngine
+    # per (symbol, timeframe) is fed only the candles closed since the last
+    # run, and the engines are persisted so a restart resumes without
+    # replaying history. Every PARITY_EVERY streamed candles, and on the
+    # first run after loading, a frame is also evaluated with `ta` on the
+    # live window; a mismatch reseeds the engine from that window.
+    def __init__(self, path, parity_every=PARITY_EVERY):
+        self.parity_every = parity_every
+        self.table = open_table(path, "streaming", key="key")
+        self.engines = {}
+        self.streamed = {}
+        for record in self.table.all():
+            self.engines[record['key']] = IndicatorEngine.from_dict(record['state'])
+            self.streamed[record['key']] = parity_every
+
+    def evaluate(self, frames):
+        # frames: {(symbol, tf): closed DataFrame with ATR} -> {(symbol, tf): evaluate_frame result}
+        results = {}
+        changed = []
+        for (symbol, tf), df in frames.items():
+            results[(symbol, tf)] = self._evaluate(symbol, tf, df, changed)
+        if changed:
+            self.table.put(*[
+                {'key': key, 'symbol': symbol, 'timeframe': tf, 'state': self.engines[key].to_dict()}
+                for key, symbol, tf in changed
+            ])
+        return results
+
+    def _evaluate(self, symbol, tf, df, changed):
+        if df is None or len(df) < MIN_BARS:
+            return None
+        key = frame_key(symbol, tf)
+        engine = self.engines.get(key)
+        times = df.index.asi8 // 1_000_000
+        i = -1 if engine is None else int(np.searchsorted(times, engine.last_open_time))
+        with METRICS.stage("streaming", (symbol, tf)) as stage:
+            if i < 0 or i == len(times) or times[i] != engine.last_open_time:
+                # No engine yet, or the frame no longer reaches back to its
+                # last candle: seed from the live window, as `ta` sees it
+                engine = self.engines[key] = IndicatorEngine(VWAP_WINDOW)
+                engine.update_frame(df)
+                self.streamed[key] = 0
+                stage["items"] = len(df)
+            else:
+                engine.update_frame(df.iloc[i + 1:])
+                self.streamed[key] = self.streamed.get(key, 0) + len(df) - i - 1
+                stage["items"] = len(df) - i - 1
+            features = engine_features(engine)
+        changed.append((key, symbol, tf))
+        if self.streamed[key] < self.parity_every:
+            return features
+        self.streamed[key] = 0
+        expected = evaluate_frame(symbol, tf, df)
+        if same_features(features, expected):
+            return features
+        print(f"Streaming indicators for {symbol}/{tf} drifted from ta; reseeding from the live window")
+        METRICS.record("parity_mismatch", 0.0, (symbol, tf), 1)
+        engine = self.engines[key] = IndicatorEngine(VWAP_WINDOW)
+        engine.update_frame(df)
+        return expected
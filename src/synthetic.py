@@ -0,0 +1,67 @@
+import zlib
+import numpy as np
+
+from src.data import INTERVAL_MS
+
+# Seeded stand-in for Binance /api/v3/klines: same row layout (12 fields,
+# prices and volumes as strings), so it goes through the real parsers.
+# A given (seed, symbol, interval, end) always yields the same candles.
+
+START_PRICE = {"BTCUSDT": 60000.0, "ETHUSDT": 3000.0, "BNBUSDT": 500.0}
+VOLATILITY = 0.004  # per-bar log-return std
+
+def _rng(seed, symbol, interval):
+    return np.random.default_rng([seed, zlib.crc32(f"{symbol}|{interval}".encode())])
+
+def synthetic_klines(symbol, interval, limit=200, end_ms=1_700_000_000_000, seed=0):
+    # `limit` bars whose last one opens at or before end_ms
+    step = INTERVAL_MS[interval]
+    rng = _rng(seed, symbol, interval)
+    returns = rng.normal(0, VOLATILITY, limit)
+    # Occasional regime shifts so trend and breakout strategies fire
+    returns += np.repeat(rng.normal(0, VOLATILITY / 4, limit // 50 + 1), 50)[:limit]
+    close = START_PRICE.get(symbol, 100.0) * np.exp(np.cumsum(returns))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, VOLATILITY, limit))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, VOLATILITY, limit))
+    volume = rng.lognormal(3, 0.5, limit)
+    trades = rng.integers(50, 5000, limit)
+    open_time = end_ms // step * step - (limit - 1 - np.arange(limit)) * step
+    return [
+        [int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}", int(t + step - 1),
+         f"{v * c:.8f}", int(n), f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0"]
+        for t, o, h, l, c, v, n in zip(open_time, open_, high, low, close, volume, trades)
+    ]
+
+def synthetic_symbols(n):
+    # Known symbols first, then made-up ones
+    symbols = list(START_PRICE)
+    return (symbols + [f"SYN{i:04d}USDT" for i in range(max(n - len(symbols), 0))])[:n]
+
+def _hash01(x):
+    # Cheap deterministic noise in [0, 1) per element
+    return np.modf(np.abs(np.sin(x) * 43758.5453))[0]
+
+def synthetic_klines_at(symbol, interval, open_times, seed=0):
+    # Time-keyed variant for the stand-in server: prices are a function of
+    # wall-clock time only, so any request window, interval or later request
+    # sees the same bar for the same open_time
+    step = INTERVAL_MS[interval]
+    open_times = np.asarray(open_times, dtype=np.int64)
+    phase = zlib.crc32(f"{seed}|{symbol}".encode()) % 100_000
+    def price(ms):
+        m = ms / 60_000 + phase
+        return START_PRICE.get(symbol, 100.0) * np.exp(
+            0.03 * np.sin(m / 977) + 0.01 * np.sin(m / 131 + 1.0) + 0.004 * np.sin(m / 17 + 2.0)
+        )
+    open_ = price(open_times)
+    close = price(open_times + step)
+    spread = VOLATILITY * np.sqrt(step / 60_000)
+    high = np.maximum(open_, close) * (1 + spread * _hash01(open_times / 7919.0 + phase))
+    low = np.minimum(open_, close) * (1 - spread * _hash01(open_times / 6151.0 + phase))
+    volume = 10 + 90 * _hash01(open_times / 4409.0 + phase) * (step / 60_000)
+    return [
+        [int(t), f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}", int(t + step - 1),
+         f"{v * c:.8f}", 100, f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0"]
+        for t, o, h, l, c, v in zip(open_times, open_, high, low, close, volume)
+    ]
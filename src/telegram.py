@@ -1,15 +1,83 @@
 import asyncio
+import os
+import threading
+import time
 from telegram import Bot
+from telegram.error import RetryAfter, BadRequest, Forbidden
+from src.metrics import METRICS
+
+# Outgoing messages are queued and delivered by one background event loop,
+# paced by token buckets sized to Telegram's limits. The send_* methods only
+# enqueue, so callers never block on the network; flush() waits for delivery.
+
+GLOBAL_RATE = 30  # messages per second across all chats
+CHAT_RATE = 1  # messages per second to a single chat
+CHAT_BURST = 3  # short bursts Telegram tolerates before throttling a chat
+SEND_RETRIES = 3
+SEND_BACKOFF = 1.0
+MAX_MESSAGE_LEN = 4096
+DIGEST_MIN = 3  # closes in one run from which they are merged into one message
+FLUSH_TIMEOUT = 120
+# TELEGRAM_API points the bot at another Bot API host, e.g. the loadtest.py stand-in
+TELEGRAM_API = os.getenv("TELEGRAM_API", "https://api.telegram.org")
 
 def emoji(side):
     return "🟢" if side == "LONG" else "🔴"
 
+def status_line(t):
+    return (
+        f"{emoji(t['side'])} {t['symbol']}/{t['timeframe']} | "
+        f"Entry: {t['entry']} | SL: {t['sl']} | "
+        f"TPs: {', '.join([str(x) for x in t['tp']])}\n"
+        f"Confidence: {t['confidence']:.2f} | "
+        f"SLNO: {t['slno']}\n"
+    )
+
+def status_message(lines):
+    if not lines:
+        return "No active trades."
+    return "<b>Active Trades:</b>\n" + "".join(lines)
+
+def stats_message(stats):
+    if not stats:
+        return "No closed trades yet."
+    msg = "<b>Strategy Stats:</b>\n"
+    for name, s in stats.items():
+        msg += f"{name}: {s['trades']} trades | Win {s['win_rate'] * 100:.0f}% | P/L {s['profit']:.2f}\n"
+    return msg
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
 class TelegramBot:
-    def __init__(self, token, chat_id):
-        self.bot = Bot(token)
+    def __init__(self, token, chat_id, digest=True):
+        self.bot = Bot(token, base_url=f"{TELEGRAM_API}/bot")
         self.chat_id = chat_id
+        self.digest = digest
+        self.loop = None
+        self.thread = None
+        self.queues = {}
+        self.workers = []
+        self.chat_buckets = {}
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self.resume_at = 0.0  # set from retry_after; holds every chat
+        self._start_lock = threading.Lock()
 
-    async def send_signal(self, signal):
+    def send_signal(self, signal):
         msg = (
             f"New Signal: {signal['symbol']}/{signal['timeframe']} 🚨\n"
             f"Direction: {'BUY' if signal['side'] == 'LONG' else 'SELL'}\n"
@@ -20,48 +88,141 @@ class TelegramBot:
             f"Confidence: {int(round(signal['confidence'] * 100))}%\n"            f"Momentum: {signal['momentum_cat']}\n"
             f"SLNO: {signal['slno']}"
         )
-        await self._send(msg)
+        self._enqueue(msg)
 
-    async def send_trade_close(self, trade, exit_info):
-        msg = (
+    def _close_text(self, trade, exit_info):
+        return (
             f"❌ Trade Closed {emoji(trade['side'])} {trade['symbol']}/{trade['timeframe']}\n"
             f"Entry: {trade['entry']}\n"
             f"Exit: {exit_info['exit_price']}\n"
             f"Reason: {exit_info['reason']}\n"
             f"SLNO: {trade['slno']}"
         )
-        await self._send(msg)
 
-    async def send_error(self, err):
+    def send_trade_close(self, trade, exit_info):
+        self._enqueue(self._close_text(trade, exit_info))
+
+    def send_trade_closes(self, closes):
+        # closes: [(trade, exit_info)] from one run; merged into a digest
+        # (split at Telegram's length limit) when there are enough of them
+        if not self.digest or len(closes) < DIGEST_MIN:
+            for trade, exit_info in closes:
+                self.send_trade_close(trade, exit_info)
+            return
+        header = f"<b>{len(closes)} trades closed</b>\n"
+        msg = header
+        for trade, exit_info in closes:
+            line = (
+                f"{emoji(trade['side'])} {trade['symbol']}/{trade['timeframe']} | "
+                f"Entry: {trade['entry']} | Exit: {exit_info['exit_price']} | "
+                f"{exit_info['reason']} | SLNO: {trade['slno']}\n"
+            )
+            if len(msg) + len(line) > MAX_MESSAGE_LEN:
+                self._enqueue(msg)
+                msg = header
+            msg += line
+        self._enqueue(msg)
+
+    def send_error(self, err):
         msg = f"⚠️ Bot Error:\n<pre>{err}</pre>"
-        await self._send(msg)
-
-    async def send_status(self, trades):
-        if not trades:
-            msg = "No active trades."
-        else:
-            msg = "<b>Active Trades:</b>\n"
-            for t in trades:
-                msg += (
-                    f"{emoji(t['side'])} {t['symbol']}/{t['timeframe']} | "
-                    f"Entry: {t['entry']} | SL: {t['sl']} | "
-                    f"TPs: {', '.join([str(x) for x in t['tp']])}\n"
-                    f"Confidence: {t['confidence']:.2f} | "
-                    f"SLNO: {t['slno']}\n"
-                )
-        await self._send(msg)
+        self._enqueue(msg[:MAX_MESSAGE_LEN - 6] + "</pre>" if len(msg) > MAX_MESSAGE_LEN else msg)
 
-    async def _send(self, msg, retry=2):
-        for i in range(retry):
+    def send_status(self, trades, chat_id=None):
+        self._enqueue(status_message([status_line(t) for t in trades]), chat_id)
+
+    def send_text(self, msg, chat_id=None):
+        self._enqueue(msg, chat_id)
+
+    def _enqueue(self, msg, chat_id=None):
+        self._start()
+        self.loop.call_soon_threadsafe(self._put, chat_id or self.chat_id, msg)
+
+    def _start(self):
+        with self._start_lock:
+            if self.thread is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever, name="telegram-sender", daemon=True)
+            self.thread.start()
+
+    def _put(self, chat_id, msg):
+        # Runs on the sender loop: one queue and worker per chat
+        if chat_id not in self.queues:
+            self.queues[chat_id] = asyncio.Queue()
+            self.chat_buckets[chat_id] = TokenBucket(CHAT_RATE, CHAT_BURST)
+            self.workers.append(self.loop.create_task(self._worker(chat_id)))
+        self.queues[chat_id].put_nowait(msg)
+
+    async def _worker(self, chat_id):
+        queue = self.queues[chat_id]
+        while True:
+            msg = await queue.get()
+            try:
+                await self._send(chat_id, msg)
+            finally:
+                queue.task_done()
+
+    async def _send(self, chat_id, msg):
+        attempt = 0
+        while True:
+            await self.chat_buckets[chat_id].acquire()
+            await self.global_bucket.acquire()
+            wait = self.resume_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            start = time.perf_counter()
             try:
                 await self.bot.send_message(
-                    chat_id=self.chat_id,
+                    chat_id=chat_id,
                     text=msg,
                     parse_mode="HTML",
                     disable_web_page_preview=True
                 )
-                break
+                METRICS.observe("telegram", time.perf_counter() - start)
+                return
+            except RetryAfter as e:
+                METRICS.observe("telegram", time.perf_counter() - start, error=True)
+                # Flood control: pause every chat for as long as Telegram asks;
+                # does not count against the retry budget
+                self.resume_at = max(self.resume_at, time.monotonic() + float(e.retry_after))
+                continue
+            except (BadRequest, Forbidden) as e:
+                METRICS.observe("telegram", time.perf_counter() - start, error=True)
+                print(f"Telegram send failed: {e}")
+                return
             except Exception as e:
-                if i == retry - 1:
+                METRICS.observe("telegram", time.perf_counter() - start, error=True)
+                attempt += 1
+                if attempt >= SEND_RETRIES:
                     print(f"Telegram send failed: {e}")
-                await asyncio.sleep(2)
\ No newline at end of file
+                    return
+                await asyncio.sleep(SEND_BACKOFF * 2 ** (attempt - 1))
+
+    async def _drain(self):
+        for queue in list(self.queues.values()):
+            await queue.join()
+
+    def flush(self, timeout=FLUSH_TIMEOUT):
+        # Block until everything queued so far has been delivered or given up on
+        if self.thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._drain(), self.loop)
+        try:
+            future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            print(f"Telegram queue not drained after {timeout}s")
+
+    async def _stop(self):
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.loop.stop()
+
+    def close(self, timeout=FLUSH_TIMEOUT):
+        self.flush(timeout)
+        if self.thread is not None:
+            asyncio.run_coroutine_threadsafe(self._stop(), self.loop)
+            self.thread.join()
+            self.loop.close()
+            self.thread = None
@@ -3,4 +3,8 @@ def is_valid_signal(signal, confidence_threshold):
         return False
     if signal['momentum'] < 40:
         return False
-    return True
\ No newline at end of file
+    return True
+
+def valid_mask(confidence, momentum, confidence_threshold):
+    # Array form of is_valid_signal; NaN momentum is never valid
+    return (confidence >= confidence_threshold) & (momentum >= 40)
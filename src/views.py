@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+
+from src.storage import data_version, read_table
+from src.cache import _sibling, aggregate_stats
+from src.telegram import status_line, status_message, stats_message
+
+# In-memory copy of the runner's persisted state for the webhook. refresh()
+# reloads a source only when its version changed, patches the rows that
+# differ and re-renders, so request handlers just return prebuilt responses.
+
+class StateView:
+    def __init__(self, trades_path, history_path):
+        self.trades_path = trades_path
+        # Stats come from StrategyHistory's persisted aggregates, which hold
+        # every closed trade rather than the last HISTORY_LIMIT records
+        self.meta_path = _sibling(history_path, "meta", ".json")
+        self.versions = {}
+        self.trades = {}
+        self.lines = {}
+        self.trade_json = {}
+        self.stats = {}
+        self.updated_at = None
+        self._lock = threading.Lock()
+        self._render_status()
+        self._render_stats()
+
+    def refresh(self):
+        with self._lock:
+            changed = self._refresh_trades()
+            changed = self._refresh_history() or changed
+            if changed:
+                self.updated_at = int(time.time())
+            return changed
+
+    def _new_version(self, name, path):
+        version = data_version(path)
+        return None if self.versions.get(name, object()) == version else version
+
+    def _refresh_trades(self):
+        version = self._new_version("trades", self.trades_path)
+        if version is None:
+            return False
+        rows = read_table(self.trades_path, "trades", key="slno")
+        if rows is None:
+            return False
+        new = {str(t['slno']): t for t in rows}
+        changed = False
+        for slno in self.trades.keys() - new.keys():
+            del self.trades[slno], self.lines[slno], self.trade_json[slno]
+            changed = True
+        for slno, trade in new.items():
+            if self.trades.get(slno) != trade:
+                self.trades[slno] = trade
+                self.lines[slno] = status_line(trade)
+                self.trade_json[slno] = json.dumps(trade).encode()
+                changed = True
+        self.versions["trades"] = version
+        if changed:
+            self._render_status()
+        return changed
+
+    def _refresh_history(self):
+        version = self._new_version("history", self.meta_path)
+        if version is None:
+            return False
+        rows = read_table(self.meta_path, "history_meta", key="name")
+        if rows is None:
+            return False
+        # Strategy-level aggregates only; per-frame ones are keyed strategy|symbol|tf
+        stats = {
+            r['name']: aggregate_stats(r) for r in rows
+            if "|" not in r['name'] and r.get('trades')
+        }
+        self.versions["history"] = version
+        if stats == self.stats:
+            return False
+        self._render_stats(stats)
+        return True
+
+    def _render_status(self):
+        self.status_text = status_message(list(self.lines.values()))
+        self.status_json = json.dumps({'count': len(self.trades), 'trades': list(self.trades.values())}).encode()
+
+    def _render_stats(self, stats=None):
+        self.stats = stats or {}
+        self.stats_text = stats_message(self.stats)
+        self.stats_json = json.dumps(self.stats).encode()
+
+    def trade(self, slno):
+        return self.trade_json.get(slno)
@@ -1,28 +1,85 @@
+import asyncio
 import os
-from fastapi import FastAPI, Request, HTTPException
-from src.cache import TradeCache
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, HTTPException, Response
 from src.telegram import TelegramBot
-
-app = FastAPI()
+from src.views import StateView
+from src.metrics import METRICS, load_totals, prometheus_text
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+STATE_DB = os.getenv("STATE_DB")
+REFRESH_INTERVAL = 1.0  # seconds between checks for new runner state
 
 tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
-trade_cache = TradeCache(".cache/active_trades.json")
+view = StateView(STATE_DB or ".cache/active_trades.json", STATE_DB or ".cache/strategy_history.json")
 
-@app.post("/webhook")
-async def webhook(request: Request):
+async def refresh_view():
+    # Reloads happen off the event loop; handlers never touch the state files
+    while True:
+        try:
+            await asyncio.to_thread(view.refresh)
+        except Exception as e:
+            print(f"State refresh failed: {e}")
+        await asyncio.sleep(REFRESH_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(view.refresh)
+    task = asyncio.create_task(refresh_view())
+    yield
+    task.cancel()
+    await asyncio.to_thread(tg.close)
+
+app = FastAPI(lifespan=lifespan)
+
+def authorize(request):
     auth = request.headers.get("Authorization", "")
     if not auth or not auth.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Unauthorized")
     token = auth.split(" ")[1]
     if token != WEBHOOK_SECRET:
         raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/webhook")
+async def webhook(request: Request):
+    authorize(request)
     data = await request.json()
+    # send_text only enqueues; delivery happens on the Telegram sender loop
     if data.get("cmd") == "/status":
-        trades = trade_cache.get_all()
-        tg.send_status(trades)
+        tg.send_text(view.status_text)
         return {"ok": True}
-    return {"ok": False}
\ No newline at end of file
+    if data.get("cmd") == "/stats":
+        tg.send_text(view.stats_text)
+        return {"ok": True}
+    return {"ok": False}
+
+@app.get("/status")
+async def status(request: Request):
+    authorize(request)
+    return Response(view.status_json, media_type="application/json")
+
+@app.get("/stats")
+async def stats(request: Request):
+    authorize(request)
+    return Response(view.stats_json, media_type="application/json")
+
+@app.get("/trades/{slno}")
+async def trade(slno: str, request: Request):
+    authorize(request)
+    body = view.trade(slno)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return Response(body, media_type="application/json")
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    # Runner totals from its last finished run plus this process's Telegram
+    # sends. The totals are read from the runner's .cache/metrics.json, so
+    # they only show up when the webhook shares that directory with the
+    # runner (daemon mode or cron on the same host); under GitHub Actions
+    # they live in the workflow's cache, not on the webhook's host
+    authorize(request)
+    text = prometheus_text(load_totals(), METRICS.snapshot())
+    return Response(text, media_type="text/plain; version=0.0.4")
@@ -1,16 +1,26 @@
+import time
+START = time.perf_counter()
 import os
 import sys
 import traceback
 from dotenv import load_dotenv
 
-print("✅ Bot is starting...")
+DAEMON = "--daemon" in sys.argv[1:] or os.getenv("BOT_MODE") == "daemon"
+
+print("✅ Bot is starting..." + (" (daemon mode)" if DAEMON else ""))
 
 try:
     load_dotenv()
-    from runner import main as run_main
-    run_main()
-    print("✅ Bot run completed successfully.")
-except Exception as e:
+    if DAEMON:
+        from runner import run_daemon
+        print(f"⏱️ Start-up imports took {(time.perf_counter() - START) * 1000:.0f} ms")
+        run_daemon()
+    else:
+        from runner import main as run_main
+        print(f"⏱️ Start-up imports took {(time.perf_counter() - START) * 1000:.0f} ms")
+        run_main()
+        print("✅ Bot run completed successfully.")
+except Exception:
     print("❌ Bot failed to start or run.")
     print(traceback.format_exc())
     sys.exit(1)
\ No newline at end of file
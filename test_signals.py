@@ -1,5 +1,4 @@
 import os
-import asyncio
 from dotenv import load_dotenv
 
 from src.data import fetch_klines, add_atr
@@ -18,7 +17,7 @@ TIMEFRAME = "5m"
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-async def main():
+def main():
     tg = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
 
     print(f"\n--- Testing signals for {SYMBOL} {TIMEFRAME} ---")
@@ -48,7 +47,7 @@ async def main():
         print(f"  Momentum: {signal['momentum_cat']}")
         print(f"  SLNO: {signal['slno']}")
         # Send to Telegram
-        await tg.send_signal(signal)
+        tg.send_signal(signal)
         sent += 1
 
     print("\n--- Telegram Status Message (Active Trades) ---")
@@ -56,13 +55,14 @@ async def main():
     trades = trade_cache.get_all()
     if not trades:
         print("No active trades.")
-        await tg.send_status([])
+        tg.send_status([])
     else:
         for t in trades:
             print(f"{t['side']} {t['symbol']}/{t['timeframe']} | Entry: {t['entry']} | SL: {t['sl']} | TPs: {t['tp']} | Confidence: {t['confidence']:.2f} | SLNO: {t['slno']}")
-        await tg.send_status(trades)
+        tg.send_status(trades)
 
+    tg.close()
     print(f"\n✅ Sent {sent} test signals and Telegram status.")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
\ No newline at end of file